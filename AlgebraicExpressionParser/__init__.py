@@ -1,3 +1,4 @@
 from AlgebraicExpressionParser.parser.parser import ExpressionParser
 from AlgebraicExpressionParser.parser.operators import Operator
 from AlgebraicExpressionParser.parser.operators import Operators
+from AlgebraicExpressionParser.evaluator.evaluator import Evaluator
@@ -0,0 +1,155 @@
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple, Union
+
+from AlgebraicExpressionParser.exceptions.exceptions import InvalidExpressionException
+from AlgebraicExpressionParser.parser.operators import Operator
+from AlgebraicExpressionParser.parser.parser import ExpressionParser, escape_charcter
+
+
+class CompiledExpression:
+    """Expression compiled into a python function, it can be called many times with different variables values."""
+
+    def __init__(self, expression: Any, function: Callable[[Mapping[str, Any]], Any], variables: Tuple[str, ...], source: str) -> None:
+        """
+        expression: represents the compiled expression (or its postfix form).
+        function: represents the compiled function. It takes one mapping from variables names to their values.
+        variables: represents the names of the variables used in the expression, in order of appearance.
+        source: represents the generated python source.
+        """
+        self.expression = expression
+        self.function = function
+        self.variables = variables
+        self.source = source
+
+    def __call__(self, variables: Optional[Mapping[str, Any]] = None, **kwargs: Any) -> Any:
+        """Evaluate the expression. Variables values are given as a mapping, keywords or both."""
+        if variables is None:
+            variables = kwargs
+        elif kwargs:
+            variables = {**variables, **kwargs}
+        return self.function(variables)
+
+    def __str__(self) -> str:
+        return f"{self.expression}"
+
+    def __repr__(self) -> str:
+        return f"CompiledExpression({self.expression!r}, variables={self.variables})"
+
+
+class Evaluator:
+    """Compiles expressions into fast reusable callables."""
+
+    def __init__(self, parser: ExpressionParser, functions: Mapping[Union[str, Tuple[str, int]], Callable], *, constant: Callable[[str], Any] = float) -> None:
+        """
+        parser: represents the parser used to get expressions postfix forms.
+            type: ExpressionParser
+        functions: represents operators implementations. Keys are operators symbols, or (symbol, Operator.unary) and
+            (symbol, Operator.binary) tuples to give different implementations for operators that share their symbol, like '-'.
+            Unary implementations take one argument, binary ones take the left and the right operands.
+            type: dict
+        constant: represents the function that converts constants tokens into values.
+            type: callable
+            default: float
+        """
+        self.parser = parser
+        self.functions = functions
+        self.constant = constant
+
+    @property
+    def parser(self) -> ExpressionParser:
+        return self._parser
+
+    @parser.setter
+    def parser(self, parser: ExpressionParser) -> None:
+        if not isinstance(parser, ExpressionParser):
+            raise TypeError(
+                f"parser has to be an ExpressionParser instance. {parser} is {type(parser)}.")
+        self._parser = parser
+
+    @property
+    def functions(self) -> Dict[Union[str, Tuple[str, int]], Callable]:
+        return self._functions
+
+    @functions.setter
+    def functions(self, functions: Mapping[Union[str, Tuple[str, int]], Callable]) -> None:
+        if not isinstance(functions, Mapping):
+            raise TypeError(
+                f"functions has to be a mapping. {functions} is {type(functions)}.")
+        for function in functions.values():
+            if not callable(function):
+                raise TypeError(
+                    f"operators implementations have to be callable. {function} is {type(function)}.")
+        self._functions = dict(functions)
+
+    def __str__(self) -> str:
+        return f"{self.parser}"
+
+    def __repr__(self) -> str:
+        return f"Evaluator({self.parser!r}, {self.functions})"
+
+    def get_function(self, operator: Operator) -> Callable:
+        """Return the implementation of the operator rule."""
+        function = self.functions.get((operator.symbol, operator.type))
+        if function is None:
+            function = self.functions.get(operator.symbol)
+        if function is None:
+            raise ValueError(
+                f"there is no implementation for operator {operator.symbol!r}.")
+        return function
+
+    def compile_postfix(self, postfix: List[Union[str, Operator]]) -> CompiledExpression:
+        """Compile a postfix form that includes operators rules, like the one returned by postfix(expression, include_operators_rules=True)."""
+        # every postfix step becomes one assignment to the stack slot it writes, so the generated code has no nesting.
+        names = {}
+        namespace = {}
+        variables = {}
+        lines = ["def _compiled(v):"]
+        depth = 0
+        is_escaped = False
+        for token in postfix:
+            if isinstance(token, Operator):
+                function = self.get_function(token)
+                name = names.get(id(function))
+                if name is None:
+                    name = names[id(function)] = f"f{len(names)}"
+                    namespace[name] = function
+                if token.type == Operator.unary:
+                    if depth < 1:
+                        raise InvalidExpressionException(
+                            "expression is not valid.")
+                    lines.append(f"    s{depth - 1} = {name}(s{depth - 1})")
+                else:
+                    if depth < 2:
+                        raise InvalidExpressionException(
+                            "expression is not valid.")
+                    lines.append(f"    s{depth - 2} = {name}(s{depth - 2}, s{depth - 1})")
+                    depth -= 1
+            elif token == escape_charcter and not is_escaped:
+                is_escaped = True
+            elif not isinstance(token, str) or not is_escaped and self.parser._is_constant(token):
+                # constants the parser already converted into numbers are used as they are.
+                name = f"c{len(namespace)}"
+                namespace[name] = self.constant(token) if isinstance(token, str) else token
+                lines.append(f"    s{depth} = {name}")
+                depth += 1
+            else:
+                is_escaped = False
+                variables.setdefault(token, None)
+                lines.append(f"    s{depth} = v[{token!r}]")
+                depth += 1
+        if depth != 1 or is_escaped:
+            raise InvalidExpressionException(
+                "expression is not valid.")
+        lines.append("    return s0")
+        source = "\n".join(lines)
+        exec(compile(source, "<compiled expression>", "exec"), namespace)
+        return CompiledExpression(postfix, namespace["_compiled"], tuple(variables), source)
+
+    def compile(self, expression: str) -> CompiledExpression:
+        """Compile the expression into a callable that takes the variables values."""
+        compiled = self.compile_postfix(self.parser.postfix(expression, include_operators_rules=True))
+        compiled.expression = expression
+        return compiled
+
+    def evaluate(self, expression: str, variables: Optional[Mapping[str, Any]] = None, **kwargs: Any) -> Any:
+        """Compile the expression and evaluate it once."""
+        return self.compile(expression)(variables, **kwargs)
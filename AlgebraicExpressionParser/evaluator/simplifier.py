@@ -0,0 +1,170 @@
+from collections import namedtuple
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple, Union
+
+from AlgebraicExpressionParser.evaluator.evaluator import Evaluator
+from AlgebraicExpressionParser.parser.dag import DagNode, NodeTable
+from AlgebraicExpressionParser.parser.node import Node
+from AlgebraicExpressionParser.parser.operators import Operator
+from AlgebraicExpressionParser.parser.parser import escape_charcter
+
+
+SimplifyStats = namedtuple("SimplifyStats", ["nodes_before", "nodes_after", "folded", "identities", "annihilated"])
+SimplifyStats.__doc__ = """Statistics of one simplification. Nodes are counted as in a tree, shared DAG nodes once per use. folded is the
+number of operators evaluated into constants, identities the number of operators dropped by identity rules and
+annihilated the number of operators replaced by their annihilator. Those count shared DAG nodes once."""
+
+# the value of the nodes that aren't constants.
+_variable = object()
+
+
+def _keep(value: Any) -> Any:
+    return value
+
+
+Rules = Mapping[Union[str, Tuple[str, int]], Any]
+
+
+class Simplifier:
+    """Folds constant subtrees and applies identity and annihilator rules to syntax trees."""
+
+    def __init__(self, evaluator: Evaluator, *, identities: Rules = {}, right_identities: Rules = {}, annihilators: Rules = {}, to_token: Optional[Callable[[Any], Any]] = None) -> None:
+        """
+        evaluator: represents the operators implementations and the constants conversion used for folding.
+            type: Evaluator
+        identities: represents the identity of binary operators on both sides, like 0 for '+'. Keys are the same as
+            Evaluator keys.
+            type: dict
+            default: empty dict {}
+        right_identities: represents the identity of binary operators on their right side only, like 0 for '-'.
+            type: dict
+            default: empty dict {}
+        annihilators: represents the value that makes binary operators return it on both sides, like 0 for '*'.
+            type: dict
+            default: empty dict {}
+        to_token: represents the function that converts folded values back into constants tokens. None keeps the values
+            if the parser yields literals as numbers, and uses str otherwise. Values whose str tokens the parser
+            wouldn't read as constants, like negative numbers, are kept as values.
+            type: callable
+            default: None
+        """
+        if not isinstance(evaluator, Evaluator):
+            raise TypeError(
+                f"evaluator has to be an Evaluator instance. {evaluator} is {type(evaluator)}.")
+        for name, rules in (("identities", identities), ("right_identities", right_identities), ("annihilators", annihilators)):
+            if not isinstance(rules, Mapping):
+                raise TypeError(
+                    f"{name} has to be a mapping. {rules} is {type(rules)}.")
+        if to_token is not None and not callable(to_token):
+            raise TypeError(
+                f"to_token has to be callable. {to_token} is {type(to_token)}.")
+        self.evaluator = evaluator
+        self.identities = dict(identities)
+        self.right_identities = dict(right_identities)
+        self.annihilators = dict(annihilators)
+        self.to_token = to_token
+
+    def __repr__(self) -> str:
+        return f"Simplifier({self.evaluator!r}, identities={self.identities}, right_identities={self.right_identities}, annihilators={self.annihilators})"
+
+    @staticmethod
+    def _rule(rules: Dict[Union[str, Tuple[str, int]], Any], symbol: Any, type: int) -> Any:
+        """Return the rule of the operator, looked up like Evaluator.get_function. None if there is none."""
+        rule = rules.get((symbol, type))
+        if rule is None:
+            rule = rules.get(symbol)
+        return rule
+
+    def simplify(self, root: Node) -> Tuple[Node, SimplifyStats]:
+        """Return a simplified copy of the tree and the simplification statistics. The tree is walked once, bottom up
+        and without recursion. DAGs give DAGs and their shared nodes are simplified once.
+        Operators without an implementation aren't folded, and folding errors like division by zero leave the subtree
+        as it is, so they happen on evaluation."""
+        if not isinstance(root, Node):
+            raise TypeError(
+                f"root has to be a Node instance. {root} is {type(root)}.")
+        make = NodeTable().make if isinstance(root, DagNode) else Node._make
+        parser = self.evaluator.parser
+        functions = self.evaluator.functions
+        constant = self.evaluator.constant
+        to_token = self.to_token
+        if to_token is None:
+            to_token = str if parser.literals.values is None else _keep
+        rule = self._rule
+        folded = identities = annihilated = 0
+        # (node, value, nodes before, nodes after) of every simplified node, by the id of the original node.
+        results: Dict[int, Tuple[Node, Any, int, int]] = {}
+        stack = [(root, False)]
+        while stack:
+            node, is_visited = stack.pop()
+            if id(node) in results:
+                continue
+            left, right = node._left, node._right
+            if not is_visited:
+                stack.append((node, True))
+                if right is not None:
+                    stack.append((right, False))
+                if left is not None:
+                    stack.append((left, False))
+                continue
+            value = node.value
+            if left is None and right is None:
+                if not isinstance(value, str):
+                    # the parser already converted the constant into a number.
+                    results[id(node)] = (make(value), value, 1, 1)
+                    continue
+                is_constant = value != escape_charcter and parser._is_constant(value)
+                results[id(node)] = (make(value), constant(value) if is_constant else _variable, 1, 1)
+                continue
+            if left is not None and right is not None:
+                left, right = results[id(left)], results[id(right)]
+                before = 1 + left[2] + right[2]
+                result = None
+                if left[1] is not _variable and right[1] is not _variable:
+                    result = self._fold(rule(functions, value, Operator.binary), make, to_token, parser._is_constant, before, left[1], right[1])
+                    if result is not None:
+                        folded += 1
+                if result is None:
+                    identity = rule(self.identities, value, Operator.binary)
+                    right_identity = rule(self.right_identities, value, Operator.binary)
+                    annihilator = rule(self.annihilators, value, Operator.binary)
+                    if right[1] is not _variable and (right[1] == identity or right[1] == right_identity):
+                        result = left
+                        identities += 1
+                    elif left[1] is not _variable and left[1] == identity:
+                        result = right
+                        identities += 1
+                    elif annihilator is not None and (left[1] == annihilator or right[1] == annihilator):
+                        result = left if left[1] == annihilator else right
+                        annihilated += 1
+                    if result is not None:
+                        result = (result[0], result[1], before, result[3])
+                if result is None:
+                    result = (make(value, left[0], right[0]), _variable, before, 1 + left[3] + right[3])
+            else:
+                child = results[id(left if left is not None else right)]
+                before = 1 + child[2]
+                result = None
+                if child[1] is not _variable:
+                    result = self._fold(rule(functions, value, Operator.unary), make, to_token, parser._is_constant, before, child[1])
+                    if result is not None:
+                        folded += 1
+                if result is None:
+                    result = (make(value, child[0] if left is not None else None, child[0] if right is not None else None), _variable, before, 1 + child[3])
+            results[id(node)] = result
+        node, _, before, after = results[id(root)]
+        return node, SimplifyStats(before, after, folded, identities, annihilated)
+
+    @staticmethod
+    def _fold(function: Optional[Callable], make: Callable[[Any, Any, Any], Node], to_token: Callable[[Any], str], is_constant: Callable[[str], bool], before: int, *arguments: Any) -> Optional[Tuple[Node, Any, int, int]]:
+        """Return the result of an operator whose operands are all constants, None if it can't be evaluated."""
+        if function is None:
+            return None
+        try:
+            value = function(*arguments)
+        except (ArithmeticError, ValueError):
+            return None
+        token = to_token(value)
+        if isinstance(token, str) and not is_constant(token):
+            # a token like '-5.0' would be read back as a variable, the value itself is a constant leaf.
+            token = value
+        return (make(token), value, before, 1)
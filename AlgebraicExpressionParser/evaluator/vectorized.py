@@ -0,0 +1,81 @@
+from typing import Any, Callable, Mapping, Optional, Tuple, Union
+
+try:
+    import numpy
+except ImportError:  # numpy is an optional dependency.
+    numpy = None
+
+from AlgebraicExpressionParser.evaluator.evaluator import CompiledExpression, Evaluator
+from AlgebraicExpressionParser.parser.parser import ExpressionParser
+
+
+class VectorizedEvaluator(Evaluator):
+    """Evaluates expressions over whole NumPy arrays of variables values, chunk by chunk."""
+
+    def __init__(self, parser: ExpressionParser, functions: Mapping[Union[str, Tuple[str, int]], Callable], *, constant: Callable[[str], Any] = float, chunk_size: int = 65536) -> None:
+        """
+        parser: represents the parser used to get expressions postfix forms.
+            type: ExpressionParser
+        functions: represents operators implementations, usually NumPy ufuncs. Keys are the same as Evaluator keys.
+            type: dict
+        constant: represents the function that converts constants tokens into values.
+            type: callable
+            default: float
+        chunk_size: represents the maximum number of rows evaluated at once. It bounds the temporary arrays size.
+            type: int
+            default: 65536
+        """
+        if numpy is None:
+            raise ImportError(
+                "numpy is required for vectorized evaluation. Install it with pip install Algebraic-Expression-Parser[numpy].")
+        super().__init__(parser, functions, constant=constant)
+        self.chunk_size = chunk_size
+
+    @property
+    def chunk_size(self) -> int:
+        return self._chunk_size
+
+    @chunk_size.setter
+    def chunk_size(self, chunk_size: int) -> None:
+        self._chunk_size = self._check_chunk_size(chunk_size)
+
+    @staticmethod
+    def _check_chunk_size(chunk_size: int) -> int:
+        if not isinstance(chunk_size, int) or chunk_size < 1:
+            raise TypeError(
+                f"chunk_size has to be a positive int. {chunk_size} is {type(chunk_size)}.")
+        return chunk_size
+
+    def __repr__(self) -> str:
+        return f"VectorizedEvaluator({self.parser!r}, {self.functions}, chunk_size={self.chunk_size})"
+
+    def run(self, compiled: CompiledExpression, variables: Mapping[str, Any], *, chunk_size: Optional[int] = None) -> "numpy.ndarray":
+        """Evaluate a compiled expression over arrays of variables values. Arrays are broadcast together and split along their first axis."""
+        chunk_size = self.chunk_size if chunk_size is None else self._check_chunk_size(chunk_size)
+        arrays = {name: numpy.asarray(variables[name]) for name in compiled.variables}
+        shape = numpy.broadcast_shapes(*(array.shape for array in arrays.values()))
+        if not shape:
+            return numpy.asarray(compiled.function(arrays))
+        arrays = {name: numpy.broadcast_to(array, shape) for name, array in arrays.items()}
+        rows = shape[0]
+        result = None
+        for start in range(0, rows, chunk_size):
+            end = min(start + chunk_size, rows)
+            chunk = compiled.function({name: array[start: end] for name, array in arrays.items()})
+            chunk = numpy.broadcast_to(chunk, (end - start,) + shape[1:])
+            if result is None:
+                result = numpy.empty(shape, dtype=chunk.dtype)
+            elif not numpy.can_cast(chunk.dtype, result.dtype, casting="safe"):
+                result = result.astype(numpy.result_type(result, chunk))
+            result[start: end] = chunk
+        if result is None:
+            result = numpy.empty(shape)
+        return result
+
+    def evaluate(self, expression: str, variables: Optional[Mapping[str, Any]] = None, *, chunk_size: Optional[int] = None, **kwargs: Any) -> "numpy.ndarray":
+        """Compile the expression and evaluate it over arrays of variables values."""
+        if variables is None:
+            variables = kwargs
+        elif kwargs:
+            variables = {**variables, **kwargs}
+        return self.run(self.compile(expression), variables, chunk_size=chunk_size)
@@ -1,10 +1,34 @@
-class InvalidExpressionException(Exception):
+from typing import Optional
+
+
+class ExpressionException(Exception):
+    """Base of the expressions errors. It tells where the error is when it is known.
+
+    offset: the offset of the offending token in the expression, its length if the expression ended too early.
+    token: the offending token, None if the expression ended too early.
+    expected: the class of token that was expected there: "operand", "operator", "close bracket" or "token" for
+        characters that aren't part of any token.
+    bracket_offset: the offset of the unmatched bracket, for brackets errors.
+    """
+
+    def __init__(self, message: str = "", *, offset: Optional[int] = None, token: Optional[str] = None, expected: Optional[str] = None, bracket_offset: Optional[int] = None) -> None:
+        super().__init__(message)
+        self.offset = offset
+        self.token = token
+        self.expected = expected
+        self.bracket_offset = bracket_offset
+        # token indexes, the parser turns them into offsets.
+        self._index = None
+        self._bracket_index = None
+
+
+class InvalidExpressionException(ExpressionException):
     """The expression is not valid. Some operators or operands are missing."""
 
     pass
 
 
-class InvalidParenthesesException(Exception):
+class InvalidParenthesesException(ExpressionException):
     """The parenthesis are not balanced in the expression."""
 
     pass
@@ -0,0 +1,264 @@
+import asyncio
+import functools
+import itertools
+import time
+from collections import deque
+from concurrent.futures import Executor
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from AlgebraicExpressionParser.exceptions.exceptions import ExpressionException, InvalidExpressionException
+from AlgebraicExpressionParser.parser.flat_tree import FlatTree
+from AlgebraicExpressionParser.parser.instrumentation import _Recorder
+from AlgebraicExpressionParser.parser.node import Node
+from AlgebraicExpressionParser.parser.operators import Operator
+
+
+def _parse_sync(parser: Any, operation: str, expression: str, recorder: Optional[_Recorder] = None) -> Any:
+    """Parse in an executor. It is a module function so that process pools can pickle it with the parser.
+    Syntax trees are returned as flat trees, pickling deep Node trees recurses. With a recorder, the result is returned
+    with the recorder, process pools return a copy of it."""
+    if operation == "postfix":
+        return parser._postfix(expression) if recorder is None else (parser._postfix(expression, recorder), recorder)
+    tree = FlatTree()
+    if recorder is None:
+        parser._build_tree(parser._postfix(expression), tree.add)
+        return tree
+    parser._build_observed_tree(expression, tree.add, recorder)
+    return tree, recorder
+
+
+class _LoopState:
+    """The state of an AsyncParser in one event loop. asyncio primitives can't be shared between loops."""
+
+    __slots__ = ("loop", "in_flight", "semaphore", "pending")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_concurrency: Optional[int]) -> None:
+        self.loop = loop
+        # the running parse of every (operation, expression, fingerprint) and the number of its waiters.
+        self.in_flight: Dict[Tuple[str, str, Any], List[Any]] = {}
+        self.semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+        self.pending = 0
+
+
+class AsyncParser:
+    """Asyncio facade of a parser that never blocks the event loop for long.
+
+    Small expressions are parsed inline. Larger ones are parsed cooperatively, yielding to the event loop every
+    yield_every tokens, or in an executor if one is given. Concurrent requests for the same expression share one parse,
+    so they get the same result objects.
+    """
+
+    def __init__(self, parser: Any, *, inline_size: int = 4096, yield_every: int = 2048, executor: Optional[Executor] = None, max_concurrency: Optional[int] = None, max_pending: Optional[int] = None) -> None:
+        """
+        parser: represents the parser.
+            type: ExpressionParser
+        inline_size: represents the length up to which expressions are parsed inline, without yielding.
+            type: int
+            default: 4096
+        yield_every: represents the number of tokens parsed between two yields to the event loop.
+            type: int
+            default: 2048
+        executor: represents the executor large expressions are parsed in, instead of cooperatively. Process pools need
+            a picklable parser and return copies of the results.
+            type: concurrent.futures.Executor
+            default: None
+        max_concurrency: represents the maximum number of large expressions parsed at once, the others wait. None
+            doesn't limit them.
+            type: int
+            default: None
+        max_pending: represents the maximum number of large expressions being parsed or waiting. Requests beyond it
+            raise asyncio.QueueFull. None doesn't limit them.
+            type: int
+            default: None
+        """
+        for name, value in (("inline_size", inline_size), ("yield_every", yield_every)):
+            if not isinstance(value, int) or value < 1:
+                raise TypeError(
+                    f"{name} has to be a positive int. {value} is {type(value)}.")
+        for name, value in (("max_concurrency", max_concurrency), ("max_pending", max_pending)):
+            if value is not None and (not isinstance(value, int) or value < 1):
+                raise TypeError(
+                    f"{name} has to be a positive int or None. {value} is {type(value)}.")
+        if executor is not None and not isinstance(executor, Executor):
+            raise TypeError(
+                f"executor has to be a concurrent.futures.Executor instance. {executor} is {type(executor)}.")
+        self.parser = parser
+        self.inline_size = inline_size
+        self.yield_every = yield_every
+        self.executor = executor
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self._loop_state = None
+
+    def __repr__(self) -> str:
+        return f"AsyncParser({self.parser!r}, inline_size={self.inline_size}, yield_every={self.yield_every})"
+
+    def _state(self) -> _LoopState:
+        loop = asyncio.get_running_loop()
+        if self._loop_state is None or self._loop_state.loop is not loop:
+            self._loop_state = _LoopState(loop, self.max_concurrency)
+        return self._loop_state
+
+    async def postfix(self, expression: str, include_operators_rules: bool = False) -> List[Union[str, Operator]]:
+        """Return the postfix form for the expression, like ExpressionParser.postfix."""
+        if not isinstance(expression, str):
+            raise TypeError(
+                f"expression has to be str. {expression} is {type(expression)}, not str.")
+        if len(expression) <= self.inline_size:
+            return self.parser.postfix(expression, include_operators_rules)
+        postfix = await self._run("postfix", expression)
+        if not include_operators_rules:
+            return await self._symbols(postfix)
+        return list(postfix)
+
+    async def _symbols(self, postfix: Tuple[Union[str, Operator], ...]) -> List[str]:
+        """Replace operators rules with their symbols, yielding to the event loop every yield_every tokens."""
+        yield_every = self.yield_every
+        symbols = []
+        for start in range(0, len(postfix), yield_every):
+            symbols.extend([c.symbol if isinstance(c, Operator) else c for c in postfix[start: start + yield_every]])
+            await asyncio.sleep(0)
+        return symbols
+
+    async def syntax_tree(self, expression: str) -> Node:
+        """Return the expression syntax tree, like ExpressionParser.syntax_tree."""
+        if not isinstance(expression, str):
+            raise TypeError(
+                f"expression has to be str. {expression} is {type(expression)}, not str.")
+        if len(expression) <= self.inline_size:
+            return self.parser.syntax_tree(expression)
+        return await self._run("syntax_tree", expression)
+
+    async def _run(self, operation: str, expression: str) -> Any:
+        """Wait for the parse of the expression, starting it unless the same one is running already. The parse is
+        cancelled when all of its waiters are cancelled."""
+        state = self._state()
+        key = (operation, expression, self.parser._fingerprint())
+        entry = state.in_flight.get(key)
+        if entry is None:
+            if self.max_pending is not None and state.pending >= self.max_pending:
+                raise asyncio.QueueFull(
+                    f"there are {state.pending} expressions being parsed already.")
+            state.pending += 1
+            task = state.loop.create_task(self._parse(operation, expression, state))
+            entry = state.in_flight[key] = [task, 0]
+            task.add_done_callback(lambda _: state.in_flight.pop(key, None) if state.in_flight.get(key) is entry else None)
+        task = entry[0]
+        entry[1] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done() and entry[1] == 1:
+                # later requests start a new parse instead of waiting for the cancelled one.
+                if state.in_flight.get(key) is entry:
+                    del state.in_flight[key]
+                task.cancel()
+            raise
+        finally:
+            entry[1] -= 1
+
+    async def _parse(self, operation: str, expression: str, state: _LoopState) -> Any:
+        try:
+            if state.semaphore is None:
+                return await self._parse_now(operation, expression)
+            async with state.semaphore:
+                return await self._parse_now(operation, expression)
+        finally:
+            state.pending -= 1
+
+    async def _parse_now(self, operation: str, expression: str) -> Any:
+        sink = self.parser.sink
+        if sink is None:
+            return await self._parse_with(operation, expression, None)
+        # like ExpressionParser._observe. Phases timings include the time spent by the event loop elsewhere.
+        recorder = _Recorder(operation, expression)
+        error = None
+        start = time.perf_counter()
+        try:
+            result, recorder = await self._parse_with(operation, expression, recorder)
+            return result
+        except BaseException as exception:
+            error = exception
+            raise
+        finally:
+            recorder.send(sink, time.perf_counter() - start, error)
+
+    async def _parse_with(self, operation: str, expression: str, recorder: Optional[_Recorder]) -> Any:
+        """Parse in the executor or cooperatively. With a recorder, return the result with the recorder that got the
+        phases metrics."""
+        if self.executor is not None:
+            result = await asyncio.get_running_loop().run_in_executor(self.executor, functools.partial(_parse_sync, self.parser, operation, expression, recorder))
+            if operation == "postfix":
+                return result
+            if recorder is not None:
+                result, recorder = result
+            tree_start = time.perf_counter()
+            nodes = []
+            for _ in result._iter_to_node(nodes, self.yield_every):
+                await asyncio.sleep(0)
+            root = nodes[-1]
+            if recorder is None:
+                return root
+            recorder.tree_seconds += time.perf_counter() - tree_start
+            return root, recorder
+        postfix = await self._postfix(expression, recorder)
+        if operation == "postfix":
+            return postfix if recorder is None else (postfix, recorder)
+        tree_start = time.perf_counter()
+        stack = deque()
+        push_node = self.parser._push_node
+        for i, token in enumerate(postfix, 1):
+            push_node(stack, token, Node._make)
+            if not i % self.yield_every:
+                await asyncio.sleep(0)
+        if recorder is None:
+            return stack.pop()
+        recorder.tree_seconds = time.perf_counter() - tree_start
+        return stack.pop(), recorder
+
+    async def _postfix(self, expression: str, recorder: Optional[_Recorder] = None) -> Tuple[Union[str, Operator], ...]:
+        """Tokenize and parse the expression, yielding to the event loop every yield_every tokens. The recorder, if
+        any, gets the phases metrics."""
+        parser = self.parser
+        cache = parser.cache
+        if cache is not None:
+            fingerprint = parser._fingerprint()
+            postfix = cache.get(expression, fingerprint)
+            if postfix is not None:
+                if recorder is not None:
+                    recorder.cached = True
+                return postfix
+        yield_every = self.yield_every
+        tokenize_start = time.perf_counter()
+        tokens = []
+        for start, end, is_valid in parser._get_lexer().scan(expression):
+            if not is_valid:
+                raise InvalidExpressionException(
+                    "expression is not valid.", offset=start, token=expression[start], expected="token")
+            tokens.append(expression[start: end])
+            if not len(tokens) % yield_every:
+                await asyncio.sleep(0)
+        operators_stack = None
+        if recorder is not None:
+            recorder.tokenize_seconds = time.perf_counter() - tokenize_start
+            recorder.tokens = len(tokens)
+            operators_stack = recorder.make_stack(parser.operators.grammar.bracket)
+        parse_start = time.perf_counter()
+        matches = {}
+        for _ in parser._iter_match_brackets(tokens, matches, yield_every):
+            await asyncio.sleep(0)
+        postfix = []
+        try:
+            for i, c in enumerate(parser._iter_parse(tokens, matches, operators_stack=operators_stack), 1):
+                postfix.append(c)
+                if not i % yield_every:
+                    await asyncio.sleep(0)
+        except ExpressionException as error:
+            parser._locate(error, lambda index: sum(map(len, itertools.islice(tokens, index))))
+            raise
+        if recorder is not None:
+            recorder.parse_seconds = time.perf_counter() - parse_start
+        postfix = tuple(postfix)
+        if cache is not None:
+            cache.put(expression, fingerprint, postfix)
+        return postfix
@@ -0,0 +1,119 @@
+import itertools
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+
+BatchResult = namedtuple("BatchResult", ["index", "expression", "result", "error"])
+BatchResult.__doc__ = """Result of one expression of a batch. error holds the raised exception and result is None if parsing failed."""
+
+_methods = ("tokenize", "postfix", "syntax_tree", "flat_syntax_tree")
+
+# the parser of a worker process, it is sent once by the pool initializer instead of with every chunk.
+_worker_parser = None
+
+
+def _parse_chunk(parser: Any, method: str, kwargs: Dict[str, Any], start: int, expressions: List[str]) -> List[BatchResult]:
+    parse = getattr(parser, method)
+    results = []
+    for index, expression in enumerate(expressions, start):
+        try:
+            results.append(BatchResult(index, expression, parse(expression, **kwargs), None))
+        except Exception as error:
+            results.append(BatchResult(index, expression, None, error))
+    return results
+
+
+def _init_worker(parser: Any) -> None:
+    global _worker_parser
+    _worker_parser = parser
+
+
+def _parse_worker_chunk(method: str, kwargs: Dict[str, Any], start: int, expressions: List[str]) -> List[BatchResult]:
+    # syntax trees travel between processes as flat trees, they are much cheaper to pickle than Node trees.
+    return _parse_chunk(_worker_parser, "flat_syntax_tree" if method == "syntax_tree" else method, kwargs, start, expressions)
+
+
+def _chunks(expressions: Iterable[str], chunk_size: int) -> Iterator[List[str]]:
+    iterator = iter(expressions)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _finish(method: str, results: List[BatchResult]) -> List[BatchResult]:
+    """Convert the flat trees of a worker chunk back into Node trees."""
+    if method != "syntax_tree":
+        return results
+    return [result._replace(result=result.result.to_node()) if result.error is None else result for result in results]
+
+
+def parse_many(parser: Any, expressions: Iterable[str], method: str = "postfix", *, workers: Optional[int] = None, chunk_size: int = 1000, ordered: bool = True, **kwargs: Any) -> Iterator[BatchResult]:
+    """Parse many expressions with one of the parser methods and yield a BatchResult for each of them.
+
+    parser: represents the parser. It is pickled once for every worker process.
+        type: ExpressionParser
+    expressions: represents the expressions. It is consumed lazily, chunk by chunk.
+        type: iterable of str
+    method: represents the parser method, one of tokenize, postfix, syntax_tree or flat_syntax_tree.
+        type: str
+        default: postfix
+    workers: represents the number of worker processes. None or 0 parses in the current process.
+        type: int
+        default: None
+    chunk_size: represents the number of expressions sent to a worker at once.
+        type: int
+        default: 1000
+    ordered: represents whether results are yielded in the expressions order or as soon as they are ready.
+        type: bool
+        default: True
+    kwargs: represents extra arguments of the parser method, like include_operators_rules.
+    """
+    if method not in _methods:
+        raise ValueError(
+            f"method has to be one of {_methods}. {method} is not.")
+    if not isinstance(chunk_size, int) or chunk_size < 1:
+        raise TypeError(
+            f"chunk_size has to be a positive int. {chunk_size} is {type(chunk_size)}.")
+    return _parse_many(parser, _chunks(expressions, chunk_size), method, workers, chunk_size, ordered, kwargs)
+
+
+def _parse_many(parser: Any, chunks: Iterator[List[str]], method: str, workers: Optional[int], chunk_size: int, ordered: bool, kwargs: Dict[str, Any]) -> Iterator[BatchResult]:
+    if not workers:
+        for start, chunk in zip(itertools.count(0, chunk_size), chunks):
+            yield from _parse_chunk(parser, method, kwargs, start, chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(parser,)) as executor:
+        # at most two chunks per worker are in flight, so huge inputs are never fully loaded.
+        pending = {}
+        ready = {}
+        next_start = 0
+        starts = itertools.count(0, chunk_size)
+        for start, chunk in zip(starts, chunks):
+            pending[executor.submit(_parse_worker_chunk, method, kwargs, start, chunk)] = start
+            if len(pending) < 2 * workers:
+                continue
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                ready[pending.pop(future)] = future.result()
+            next_start = yield from _flush(method, ready, next_start, chunk_size, ordered)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                ready[pending.pop(future)] = future.result()
+            next_start = yield from _flush(method, ready, next_start, chunk_size, ordered)
+
+
+def _flush(method: str, ready: Dict[int, List[BatchResult]], next_start: int, chunk_size: int, ordered: bool) -> Iterator[BatchResult]:
+    """Yield the finished chunks that can be yielded and return the start of the next chunk in order."""
+    if not ordered:
+        for start in list(ready):
+            yield from _finish(method, ready.pop(start))
+        return next_start
+    while next_start in ready:
+        yield from _finish(method, ready.pop(next_start))
+        next_start += chunk_size
+    return next_start
@@ -0,0 +1,83 @@
+import threading
+from collections import OrderedDict, namedtuple
+from typing import Any, Hashable, Optional
+
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "evictions", "invalidations", "maxsize", "currsize"])
+
+
+class ParseCache:
+    """Thread safe bounded LRU cache of parse results.
+
+    Entries are valid for one parser configuration only. Whenever a lookup comes with a different configuration
+    fingerprint, all entries are dropped.
+    """
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        """
+        maxsize: represents the maximum number of cached expressions.
+            type: int
+            default: 1024
+        """
+        if not isinstance(maxsize, int) or maxsize < 1:
+            raise TypeError(
+                f"maxsize has to be a positive int. {maxsize} is {type(maxsize)}.")
+        self._maxsize = maxsize
+        self._entries = OrderedDict()
+        self._fingerprint = None
+        self._lock = threading.Lock()
+        self._hits = self._misses = self._evictions = self._invalidations = 0
+
+    @property
+    def maxsize(self) -> int:
+        return self._maxsize
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __str__(self) -> str:
+        return f"{self.info()}"
+
+    def __repr__(self) -> str:
+        return f"ParseCache(maxsize={self.maxsize})"
+
+    def _check_fingerprint(self, fingerprint: Hashable) -> None:
+        if fingerprint != self._fingerprint:
+            if self._entries:
+                self._invalidations += 1
+            self._entries.clear()
+            self._fingerprint = fingerprint
+
+    def get(self, expression: str, fingerprint: Hashable) -> Optional[Any]:
+        """Return the cached result of the expression, None if it is not cached."""
+        with self._lock:
+            self._check_fingerprint(fingerprint)
+            result = self._entries.get(expression)
+            if result is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(expression)
+            self._hits += 1
+            return result
+
+    def put(self, expression: str, fingerprint: Hashable, result: Any) -> None:
+        """Cache an immutable result of the expression, evicting the least recently used one if the cache is full."""
+        with self._lock:
+            self._check_fingerprint(fingerprint)
+            self._entries[expression] = result
+            self._entries.move_to_end(expression)
+            if len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self) -> None:
+        """Drop all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._fingerprint = None
+            self._hits = self._misses = self._evictions = self._invalidations = 0
+
+    def info(self) -> CacheInfo:
+        """Return the cache statistics."""
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self._evictions, self._invalidations, self._maxsize, len(self._entries))
@@ -0,0 +1,145 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from AlgebraicExpressionParser.parser.node import Node, _value_key
+
+
+class DagNode(Node):
+    """Immutable syntax tree node made by a NodeTable. Structurally identical subtrees of a table are one shared node.
+
+    The structural hash is computed once when the node is made. Nodes of the same table are equal only if they are the
+    same node, so comparing them is O(1).
+    """
+
+    __slots__ = ("_hash",)
+
+    def __init__(self, value: Any, *, left: Optional["DagNode"] = None, right: Optional["DagNode"] = None) -> None:
+        # a node made directly isn't shared with the nodes of any table, NodeTable.make shares them.
+        for child in (left, right):
+            if child is not None and not isinstance(child, DagNode):
+                raise TypeError(
+                    f"DagNode children has to be DagNode instances.")
+        object.__setattr__(self, "value", value)
+        object.__setattr__(self, "_left", left)
+        object.__setattr__(self, "_right", right)
+        object.__setattr__(self, "_hash", hash((_value_key(value), left, right)))
+
+    @classmethod
+    def _make(cls, value: Any, left: Optional["DagNode"] = None, right: Optional["DagNode"] = None) -> "DagNode":
+        node = cls.__new__(cls)
+        object.__setattr__(node, "value", value)
+        object.__setattr__(node, "_left", left)
+        object.__setattr__(node, "_right", right)
+        object.__setattr__(node, "_hash", hash((_value_key(value), left, right)))
+        return node
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(
+            f"DagNode is immutable, it may be shared by many subtrees.")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(
+            f"DagNode is immutable, it may be shared by many subtrees.")
+
+    def __reduce__(self) -> Tuple[Any, Tuple[Any, ...]]:
+        # pickle memoizes the children, so shared nodes stay shared.
+        return (DagNode._make, (self.value, self._left, self._right))
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __eq__(self, other: Any) -> bool:
+        if self is other:
+            return True
+        if not isinstance(other, DagNode):
+            return NotImplemented
+        # nodes of different tables are compared structurally.
+        stack = [(self, other)]
+        while stack:
+            a, b = stack.pop()
+            if a is b:
+                continue
+            if a is None or b is None or a._hash != b._hash or _value_key(a.value) != _value_key(b.value):
+                return False
+            stack.append((a._left, b._left))
+            stack.append((a._right, b._right))
+        return True
+
+    def iter_preorder(self, *, nodes: bool = False, unique: bool = False) -> Iterator[Any]:
+        """Yield the tree values in preorder, or the nodes themselves if nodes is True.
+        If unique is True, shared nodes are visited once, at their first occurrence."""
+        if not unique:
+            yield from super().iter_preorder(nodes=nodes)
+            return
+        seen = set()
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+            yield node if nodes else node.value
+            if node._right is not None:
+                stack.append(node._right)
+            if node._left is not None:
+                stack.append(node._left)
+
+    def iter_postorder(self, *, nodes: bool = False, unique: bool = False) -> Iterator[Any]:
+        """Yield the tree values in postorder, or the nodes themselves if nodes is True.
+        If unique is True, shared nodes are visited once, so every node comes after all of its children."""
+        if not unique:
+            yield from super().iter_postorder(nodes=nodes)
+            return
+        seen = set()
+        stack = [(self, False)]
+        while stack:
+            node, are_children_visited = stack.pop()
+            if are_children_visited:
+                yield node if nodes else node.value
+                continue
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+            stack.append((node, True))
+            if node._right is not None:
+                stack.append((node._right, False))
+            if node._left is not None:
+                stack.append((node._left, False))
+
+    def preorder(self, *, unique: bool = False) -> List[Any]:
+        return list(self.iter_preorder(unique=unique))
+
+    def postorder(self, *, unique: bool = False) -> List[Any]:
+        return list(self.iter_postorder(unique=unique))
+
+
+class NodeTable:
+    """Hash consing table. It makes every distinct (value, left, right) node once and returns it for every occurrence.
+
+    A table can be shared between expressions to share their common subexpressions too. It keeps its nodes alive until
+    it is cleared.
+    """
+
+    __slots__ = ("_nodes",)
+
+    def __init__(self) -> None:
+        self._nodes: Dict[Tuple[Tuple[type, Any], Optional[DagNode], Optional[DagNode]], DagNode] = {}
+
+    def make(self, value: Any, left: Optional[DagNode] = None, right: Optional[DagNode] = None) -> DagNode:
+        """Return the node of value with these children, children have to be nodes of this table or None."""
+        key = (_value_key(value), left, right)
+        node = self._nodes.get(key)
+        if node is None:
+            node = self._nodes[key] = DagNode._make(value, left, right)
+        return node
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __str__(self) -> str:
+        return f"NodeTable: ({len(self)} nodes)"
+
+    def __repr__(self) -> str:
+        return f"NodeTable()"
+
+    def clear(self) -> None:
+        self._nodes.clear()
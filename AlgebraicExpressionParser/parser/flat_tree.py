@@ -0,0 +1,177 @@
+from array import array
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from AlgebraicExpressionParser.parser.node import Node, _value_key
+
+
+class FlatTree:
+    """Syntax tree stored as parallel arrays in postfix order. The root is the last node."""
+
+    __slots__ = ("values", "codes", "lefts", "rights", "_values_codes")
+
+    def __init__(self) -> None:
+        # values holds every distinct node value once, codes[i] is the index of node i value in it.
+        # lefts[i] and rights[i] are the indexes of node i children, -1 if there is no child.
+        self.values: List[Any] = []
+        self.codes = array("i")
+        self.lefts = array("i")
+        self.rights = array("i")
+        self._values_codes: Dict[Tuple[type, Any], int] = {}
+
+    def add(self, value: Any, left: Optional[int] = None, right: Optional[int] = None) -> int:
+        """Append a node whose children are already in the tree and return its index."""
+        key = _value_key(value)
+        code = self._values_codes.get(key)
+        if code is None:
+            code = len(self.values)
+            self._values_codes[key] = code
+            self.values.append(value)
+        self.codes.append(code)
+        self.lefts.append(-1 if left is None else left)
+        self.rights.append(-1 if right is None else right)
+        return len(self.codes) - 1
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __str__(self) -> str:
+        return f"FlatTree: (values: {self.values}, codes: {self.codes.tolist()}, lefts: {self.lefts.tolist()}, rights: {self.rights.tolist()})"
+
+    def __repr__(self) -> str:
+        return f"FlatTree(values={self.values}, codes={self.codes.tolist()}, lefts={self.lefts.tolist()}, rights={self.rights.tolist()})"
+
+    @property
+    def root(self) -> Optional["FlatNode"]:
+        if not self.codes:
+            return None
+        return FlatNode(self, len(self.codes) - 1)
+
+    def value(self, index: int) -> Any:
+        return self.values[self.codes[index]]
+
+    def _root_index(self, index: Optional[int]) -> int:
+        return len(self.codes) - 1 if index is None else index
+
+    def preorder(self, index: Optional[int] = None) -> List[Any]:
+        """Return the values of the subtree rooted at index (the whole tree by default) in preorder."""
+        values, codes, lefts, rights = self.values, self.codes, self.lefts, self.rights
+        result = []
+        stack = [self._root_index(index)]
+        while stack:
+            i = stack.pop()
+            if i < 0:
+                continue
+            result.append(values[codes[i]])
+            stack.append(rights[i])
+            stack.append(lefts[i])
+        return result
+
+    def inorder(self, index: Optional[int] = None) -> List[Any]:
+        """Return the values of the subtree rooted at index (the whole tree by default) in inorder."""
+        values, codes, lefts, rights = self.values, self.codes, self.lefts, self.rights
+        result = []
+        stack = []
+        i = self._root_index(index)
+        while stack or i >= 0:
+            while i >= 0:
+                stack.append(i)
+                i = lefts[i]
+            i = stack.pop()
+            result.append(values[codes[i]])
+            i = rights[i]
+        return result
+
+    def postorder(self, index: Optional[int] = None) -> List[Any]:
+        """Return the values of the subtree rooted at index (the whole tree by default) in postorder."""
+        values, codes, lefts, rights = self.values, self.codes, self.lefts, self.rights
+        result = []
+        stack = [self._root_index(index)]
+        while stack:
+            i = stack.pop()
+            if i < 0:
+                continue
+            result.append(values[codes[i]])
+            stack.append(lefts[i])
+            stack.append(rights[i])
+        result.reverse()
+        return result
+
+    @classmethod
+    def from_node(cls, root: Optional[Node]) -> "FlatTree":
+        """Convert a Node tree into a FlatTree."""
+        tree = cls()
+        if root is None:
+            return tree
+        indexes = {}
+        stack = [(root, False)]
+        while stack:
+            node, are_children_added = stack.pop()
+            if are_children_added:
+                left = indexes[id(node.left)] if node.left is not None else None
+                right = indexes[id(node.right)] if node.right is not None else None
+                indexes[id(node)] = tree.add(node.value, left, right)
+                continue
+            stack.append((node, True))
+            if node.right is not None:
+                stack.append((node.right, False))
+            if node.left is not None:
+                stack.append((node.left, False))
+        return tree
+
+    def to_node(self) -> Optional[Node]:
+        """Convert the tree into a Node tree."""
+        nodes = []
+        deque(self._iter_to_node(nodes, max(len(self.codes), 1)), maxlen=0)
+        return nodes[-1] if nodes else None
+
+    def _iter_to_node(self, nodes: List[Node], chunk_size: int) -> Iterator[None]:
+        """Append the Node of every node to nodes, the root last, yielding after every chunk_size nodes."""
+        values, codes, lefts, rights = self.values, self.codes, self.lefts, self.rights
+        make = Node._make
+        sz = len(codes)
+        for start in range(0, sz, chunk_size):
+            for i in range(start, min(start + chunk_size, sz)):
+                left = nodes[lefts[i]] if lefts[i] >= 0 else None
+                right = nodes[rights[i]] if rights[i] >= 0 else None
+                nodes.append(make(values[codes[i]], left, right))
+            yield
+
+
+class FlatNode:
+    """Node like view of a FlatTree node."""
+
+    __slots__ = ("tree", "index")
+
+    def __init__(self, tree: FlatTree, index: int) -> None:
+        self.tree = tree
+        self.index = index
+
+    @property
+    def value(self) -> Any:
+        return self.tree.value(self.index)
+
+    @property
+    def left(self) -> Optional["FlatNode"]:
+        left = self.tree.lefts[self.index]
+        return FlatNode(self.tree, left) if left >= 0 else None
+
+    @property
+    def right(self) -> Optional["FlatNode"]:
+        right = self.tree.rights[self.index]
+        return FlatNode(self.tree, right) if right >= 0 else None
+
+    def __str__(self) -> str:
+        return f"FlatNode: (value: {self.value}, left: {self.left}, right: {self.right})"
+
+    def __repr__(self) -> str:
+        return f"FlatNode(value={self.value}, left={self.left}, right={self.right})"
+
+    def preorder(self) -> List[Any]:
+        return self.tree.preorder(self.index)
+
+    def inorder(self) -> List[Any]:
+        return self.tree.inorder(self.index)
+
+    def postorder(self) -> List[Any]:
+        return self.tree.postorder(self.index)
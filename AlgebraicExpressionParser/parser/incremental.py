@@ -0,0 +1,390 @@
+import itertools
+import operator
+from typing import Any, Iterator, List, Optional, Tuple, Union
+
+from AlgebraicExpressionParser.exceptions.exceptions import ExpressionException, InvalidExpressionException
+from AlgebraicExpressionParser.parser.node import Node
+from AlgebraicExpressionParser.parser.operators import Operator
+from AlgebraicExpressionParser.parser.lexer import escape_charcter
+
+
+class _InvalidToken(str):
+    """Text the lexer couldn't match, one character long."""
+
+    pass
+
+
+class _Block:
+    """Consecutive tokens parsed together. Their results are reused while the tokens and the parser state before them
+    don't change.
+
+    entry is the parser state before the tokens, (operators stack, open brackets, is_previous_character_operand).
+    postfix is None until the tokens are parsed from entry. tree is (input nodes, recipes, pushed references, pushed
+    nodes) of the syntax tree nodes made from postfix, see ParseSession._build.
+    """
+
+    __slots__ = ("tokens", "size", "invalid", "entry", "postfix", "symbols", "tree")
+
+    def __init__(self, tokens: List[str], entry: Optional[Tuple[Tuple[int, ...], Tuple[str, ...], bool]] = None) -> None:
+        self.tokens = tokens
+        self.size = sum(map(len, tokens))
+        self.invalid = sum(isinstance(token, _InvalidToken) for token in tokens)
+        self.entry = entry
+        self.postfix = None
+        self.symbols = None
+        self.tree = None
+
+
+class ParseSession:
+    """Parsing session of an expression that is edited many times, like in a formula editor.
+
+    Tokens are kept in blocks of about _block_size tokens, with their lengths instead of their offsets. An edit re-lexes
+    the tokens around the edited text and marks their blocks as changed. Parsing resumes from the state saved before
+    the first changed block and stops at the first unchanged block after the changed ones that is reached in the state
+    it was parsed from, the postfix forms of the other blocks are reused. Syntax trees rebuild only the nodes that have
+    changed descendants and share the others with earlier trees, so they must not be modified.
+
+    So an edit costs the tokens of the blocks around it, the ancestors of the changed nodes and a constant time per
+    block, besides copying the text and the returned postfix list. Invalid expressions are parsed again in full to
+    raise the same error as ExpressionParser.postfix.
+    """
+
+    _block_size = 128
+
+    def __init__(self, parser: Any, text: str = "") -> None:
+        """
+        parser: represents the parser whose rules are used.
+            type: ExpressionParser
+        text: represents the initial expression.
+            type: str
+            default: empty string
+        """
+        self._parser = parser
+        self.text = text
+
+    @property
+    def parser(self) -> Any:
+        return self._parser
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    @text.setter
+    def text(self, text: str) -> None:
+        if not isinstance(text, str):
+            raise TypeError(
+                f"text has to be str. {text} is {type(text)}, not str.")
+        self._text = text
+        self._fingerprint = self.parser._fingerprint()
+        self._blocks: List[_Block] = []
+        # the results of the operators left on the stack at the end, entry is the state after the last block.
+        self._tail = _Block([])
+        tokens, _, _ = self._lex(text, 0)
+        self._blocks = self._split(tokens, self._start())
+        self._is_parsed = False
+        self._root = None
+
+    @property
+    def tokens(self) -> List[str]:
+        self._check_fingerprint()
+        return [str(token) for token in self._iter_tokens()]
+
+    @property
+    def spans(self) -> List[Tuple[int, int]]:
+        """Return the (start, end) offsets of every token in the text."""
+        self._check_fingerprint()
+        ends = list(itertools.accumulate(map(len, self._iter_tokens())))
+        return list(zip([0] + ends[:-1], ends))
+
+    def __str__(self) -> str:
+        return f"{self.text}"
+
+    def __repr__(self) -> str:
+        return f"ParseSession({self.parser!r}, {self.text!r})"
+
+    def _check_fingerprint(self) -> None:
+        """Re-lex everything if the parser operators or special variables changed."""
+        if self._fingerprint != self.parser._fingerprint():
+            self.text = self.text
+
+    def _iter_tokens(self) -> Iterator[str]:
+        return itertools.chain.from_iterable(block.tokens for block in self._blocks)
+
+    def _start(self) -> Tuple[Tuple[int, ...], Tuple[str, ...], bool]:
+        """Return the parser state before the first token."""
+        return (self.parser.operators.grammar.bracket,), (), False
+
+    def _split(self, tokens: List[str], entry: Optional[Tuple[Tuple[int, ...], Tuple[str, ...], bool]]) -> List[_Block]:
+        """Return the blocks of tokens, the first one starts in the entry state."""
+        size = self._block_size
+        count = max(len(tokens) // size, 1) if len(tokens) > 2 * size else 1
+        bounds = [len(tokens) * k // count for k in range(count + 1)]
+        blocks = [_Block(tokens[start: end]) for start, end in zip(bounds, bounds[1:]) if end > start]
+        if blocks:
+            blocks[0].entry = entry
+        return blocks
+
+    def _iter_old_tokens(self, block_idx: int, token_idx: int, start: int) -> Iterator[Tuple[int, int, int]]:
+        """Yield (start, block index, token index) of the tokens from token_idx of block_idx on, then the end of the
+        text as (length, number of blocks, 0)."""
+        for block in itertools.islice(self._blocks, block_idx, None):
+            for token in itertools.islice(block.tokens, token_idx, None):
+                yield start, block_idx, token_idx
+                start += len(token)
+                token_idx += 1
+            block_idx += 1
+            token_idx = 0
+        yield start, block_idx, 0
+
+    def _lex(self, text: str, start: int, resync: Optional[Tuple[int, int, Iterator[Tuple[int, int, int]]]] = None) -> Tuple[List[str], int, int]:
+        """Tokenize text from start. Unmatched characters become _InvalidToken instances instead of raising.
+        resync is (edit end, shift, old tokens from _iter_old_tokens). Lexing stops at the first token after the edit
+        end that starts where an old token started, since the old tokens from there on are still valid. Return the
+        tokens and the (block index, token index) of the first old token that is kept."""
+        lexer = self.parser._get_lexer()
+        tokens = []
+        sz = len(text)
+        idx = start
+        if resync is not None:
+            edit_end, shift, old_tokens = resync
+            old_start, block_idx, token_idx = next(old_tokens)
+        while idx < sz:
+            if resync is not None and idx >= edit_end:
+                while old_start + shift < idx:
+                    old_start, block_idx, token_idx = next(old_tokens)
+                if old_start + shift == idx:
+                    return tokens, block_idx, token_idx
+            end = lexer.match(text, idx)
+            if end == idx:
+                tokens.append(_InvalidToken(text[idx]))
+                end = idx + 1
+            else:
+                tokens.append(text[idx: end])
+            idx = end
+        return tokens, len(self._blocks), 0
+
+    def _find(self, offset: int) -> Tuple[int, int, int]:
+        """Return the (block index, token index, start) of the last token that starts at or before offset."""
+        start = 0
+        if offset > 0:
+            for block_idx, block in enumerate(self._blocks):
+                if start + block.size > offset:
+                    for token_idx, token in enumerate(block.tokens):
+                        if start + len(token) > offset:
+                            return block_idx, token_idx, start
+                        start += len(token)
+                start += block.size
+        return 0, 0, 0
+
+    def edit(self, offset: int, deleted: int, inserted: str = "") -> None:
+        """Replace deleted characters at offset with inserted text."""
+        if not isinstance(inserted, str):
+            raise TypeError(
+                f"inserted has to be str. {inserted} is {type(inserted)}, not str.")
+        if not 0 <= offset <= len(self.text) or deleted < 0 or offset + deleted > len(self.text):
+            raise ValueError(
+                f"edit ({offset}, {deleted}) is out of the text range.")
+        text = self.text[:offset] + inserted + self.text[offset + deleted:]
+        if self._fingerprint != self.parser._fingerprint():
+            self.text = text
+            return
+        # a token can only be changed by the text up to lookahead characters after it.
+        first, first_token, start = self._find(offset - self.parser._get_lexer().lookahead)
+        old_tokens = self._iter_old_tokens(first, first_token, start)
+        tokens, last, last_token = self._lex(text, start, (offset + len(inserted), len(inserted) - deleted, old_tokens))
+        self._text = text
+        self._is_parsed = False
+        self._root = None
+
+        # the blocks of the re-lexed tokens are replaced by blocks to parse again, the first one starts in the same state.
+        blocks = self._blocks
+        if first < len(blocks):
+            entry = blocks[first].entry
+            tokens = blocks[first].tokens[:first_token] + tokens
+        else:
+            entry = self._start()
+        if last_token:
+            tokens += blocks[last].tokens[last_token:]
+            last += 1
+        # small blocks are merged with their neighbours, so the state before the edit is kept by a block.
+        if len(tokens) <= self._block_size // 2:
+            if last < len(blocks):
+                tokens += blocks[last].tokens
+                last += 1
+            elif first > 0:
+                first -= 1
+                entry = blocks[first].entry
+                tokens = blocks[first].tokens + tokens
+        blocks[first: last] = self._split(tokens, entry)
+
+    def _parse(self) -> None:
+        """Parse the changed blocks, raising the same exceptions as ExpressionParser.postfix."""
+        self._check_fingerprint()
+        if self._is_parsed:
+            return
+        blocks = self._blocks
+        if any(block.invalid for block in blocks):
+            start = 0
+            for token in self._iter_tokens():
+                if isinstance(token, _InvalidToken):
+                    raise InvalidExpressionException(
+                        "expression is not valid.", offset=start, token=str(token), expected="token")
+                start += len(token)
+        changed = [k for k, block in enumerate(blocks) if block.postfix is None]
+        if changed:
+            k, last_changed = changed[0], changed[-1]
+            state = blocks[k].entry
+        else:
+            k, last_changed = len(blocks), -1
+            state = self._tail.entry if blocks else self._start()
+        # results are kept only if the whole expression is valid, so the saved states always follow each other.
+        results = []
+        while k < len(blocks):
+            block = blocks[k]
+            if block.postfix is not None and block.entry == state:
+                if k > last_changed:
+                    break
+                k += 1
+                state = blocks[k].entry if k < len(blocks) else self._tail.entry
+                continue
+            # parts can't end between an escape and its token.
+            while k + 1 < len(blocks) and self._is_escaping(block.tokens):
+                block.tokens = block.tokens + blocks[k + 1].tokens
+                block.size += blocks[k + 1].size
+                block.invalid += blocks[k + 1].invalid
+                del blocks[k + 1]
+                last_changed -= last_changed > k
+            resumed = [list(state[0]), list(state[1]), state[2]]
+            try:
+                postfix = list(self.parser._iter_parse(block.tokens, state=resumed))
+            except ExpressionException:
+                self._raise_error()
+            results.append((block, state, postfix))
+            state = (tuple(resumed[0]), tuple(resumed[1]), resumed[2])
+            k += 1
+        else:
+            if state[1] or not state[2]:
+                self._raise_error()
+            tail = self._tail
+            if tail.postfix is None or tail.entry != state:
+                rules = self.parser.operators.grammar.rules
+                results.append((tail, state, [rules[rule] for rule in reversed(state[0][1:])]))
+        for block, entry, postfix in results:
+            block.entry = entry
+            block.postfix = postfix
+            block.symbols = None
+            block.tree = None
+        self._is_parsed = True
+
+    @staticmethod
+    def _is_escaping(tokens: List[str]) -> bool:
+        """Return True if the last token is an escape that escapes the token after it."""
+        count = 0
+        for token in reversed(tokens):
+            if token != escape_charcter:
+                break
+            count += 1
+        return count % 2 == 1
+
+    def _raise_error(self) -> None:
+        """Parse all the tokens again to raise the error of ExpressionParser.postfix, with its offsets."""
+        self.parser._parse(list(self._iter_tokens()), [])
+        raise InvalidExpressionException(
+            "expression is not valid.")
+
+    def _build(self, block: _Block, stack: List[Node]) -> None:
+        """Replace the nodes popped by the block postfix form from the stack with the nodes it makes.
+
+        Nodes made only from nodes of the block are kept in block.tree with the nodes they were made from. The others
+        are kept as recipes (value, left, right), whose children are nodes, None, indexes of earlier recipes or
+        negative indexes of the popped stack nodes, to remake them when the nodes before the block change.
+        """
+        if block.tree is not None:
+            inputs, recipes, references, pushed = block.tree
+            if len(inputs) > len(stack):
+                raise InvalidExpressionException(
+                    "expression is not valid.")
+            current = stack[len(stack) - len(inputs):]
+            if not all(map(operator.is_, current, inputs)):
+                made = []
+                for value, left, right in recipes:
+                    if type(left) is int:
+                        left = made[left] if left >= 0 else stack[left]
+                    if type(right) is int:
+                        right = made[right] if right >= 0 else stack[right]
+                    made.append(Node._make(value, left, right))
+                pushed = [made[reference] if type(reference) is int else reference for reference in references]
+                block.tree = (tuple(current), recipes, references, pushed)
+            del stack[len(stack) - len(inputs):]
+            stack.extend(pushed)
+            return
+
+        # made holds (node, reference) of the nodes the block made, reference is None for the ones made only from
+        # nodes of the block.
+        made = []
+        recipes = []
+        popped = 0
+
+        def pop() -> Tuple[Node, Any]:
+            nonlocal popped
+            if made:
+                return made.pop()
+            popped += 1
+            if popped > len(stack):
+                raise InvalidExpressionException(
+                    "expression is not valid.")
+            return stack[-popped], -popped
+
+        for token in block.postfix:
+            left = right = (None, None)
+            value = token
+            if isinstance(token, Operator):
+                value = token.symbol
+                if token.type == Operator.unary:
+                    if token.position == Operator.postfix:
+                        left = pop()
+                    if token.position == Operator.prefix:
+                        right = pop()
+                if token.type == Operator.binary:
+                    right = pop()
+                    left = pop()
+            node = Node._make(value, left[0], right[0])
+            if left[1] is None and right[1] is None:
+                made.append((node, None))
+                continue
+            recipes.append((value, left[0] if left[1] is None else left[1], right[0] if right[1] is None else right[1]))
+            made.append((node, len(recipes) - 1))
+        inputs = tuple(stack[len(stack) - popped:])
+        references = tuple(node if reference is None else reference for node, reference in made)
+        pushed = [node for node, _ in made]
+        block.tree = (inputs, recipes, references, pushed)
+        del stack[len(stack) - popped:]
+        stack.extend(pushed)
+
+    def postfix(self, include_operators_rules: bool = False) -> List[Union[str, Operator]]:
+        """Return the postfix form of the current text, raising the same exceptions as ExpressionParser.postfix."""
+        self._parse()
+        blocks = self._blocks + [self._tail]
+        if include_operators_rules:
+            return list(itertools.chain.from_iterable(block.postfix for block in blocks))
+        for block in blocks:
+            if block.symbols is None:
+                block.symbols = [c.symbol if isinstance(c, Operator) else c for c in block.postfix]
+        return list(itertools.chain.from_iterable(block.symbols for block in blocks))
+
+    def syntax_tree(self) -> Node:
+        """Return the syntax tree of the current text. It shares unchanged subtrees with earlier trees."""
+        self._parse()
+        if self._root is None:
+            stack = []
+            try:
+                for block in self._blocks + [self._tail]:
+                    self._build(block, stack)
+                # like syntax_tree(), the error is raised only when the tree is asked for.
+                self._root = stack.pop()
+            except InvalidExpressionException as error:
+                self._root = error
+        if isinstance(self._root, Exception):
+            raise self._root
+        return self._root
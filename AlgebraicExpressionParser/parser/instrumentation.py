@@ -0,0 +1,260 @@
+import math
+import os
+import threading
+import time
+import warnings
+from abc import ABC, abstractmethod
+from collections import deque, namedtuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+ParseMetrics = namedtuple("ParseMetrics", ["operation", "characters", "tokens", "cached", "tokenize_seconds", "parse_seconds",
+                                           "tree_seconds", "total_seconds", "max_stack_depth", "max_nesting", "error"])
+ParseMetrics.__doc__ = """Metrics of one parser call. Phases that didn't finish, because the result was cached or parsing failed, are
+None. error is the name of the raised exception type, None on success."""
+
+_phases = ("tokenize_seconds", "parse_seconds", "tree_seconds", "total_seconds")
+
+
+class _RecordingStack(list):
+    """Operators stack that records its maximum depth and brackets nesting. It is only used when metrics are recorded."""
+
+    __slots__ = ("_bracket", "_depth", "_nesting", "max_depth", "max_nesting")
+
+    def __init__(self, bracket: int) -> None:
+        super().__init__()
+        self._bracket = bracket
+        self._depth = 0
+        # the parser pushes one bracket marker at the bottom of the stack.
+        self._nesting = -1
+        self.max_depth = self.max_nesting = 0
+
+    def append(self, item: int) -> None:
+        list.append(self, item)
+        if item == self._bracket:
+            self._nesting += 1
+            self.max_nesting = max(self.max_nesting, self._nesting)
+        else:
+            self._depth += 1
+            self.max_depth = max(self.max_depth, self._depth)
+
+    def pop(self) -> int:
+        item = list.pop(self)
+        if item == self._bracket:
+            self._nesting -= 1
+        else:
+            self._depth -= 1
+        return item
+
+
+class _Recorder:
+    """Collects the metrics of one parser call while it runs."""
+
+    __slots__ = ("operation", "characters", "tokens", "cached", "tokenize_seconds", "parse_seconds", "tree_seconds", "stack")
+
+    def __init__(self, operation: str, expression: str) -> None:
+        self.operation = operation
+        self.characters = len(expression)
+        self.tokens = None
+        self.cached = False
+        self.tokenize_seconds = self.parse_seconds = self.tree_seconds = None
+        self.stack = None
+
+    def make_stack(self, bracket: int) -> _RecordingStack:
+        self.stack = _RecordingStack(bracket)
+        return self.stack
+
+    def metrics(self, total_seconds: float, error: Optional[BaseException]) -> ParseMetrics:
+        stack = self.stack
+        return ParseMetrics(self.operation, self.characters, self.tokens, self.cached, self.tokenize_seconds, self.parse_seconds,
+                            self.tree_seconds, total_seconds, stack.max_depth if stack is not None else None,
+                            stack.max_nesting if stack is not None else None, type(error).__name__ if error is not None else None)
+
+    def send(self, sink: "MetricsSink", total_seconds: float, error: Optional[BaseException]) -> None:
+        """Send the metrics to the sink. A failing sink only warns, so it never hides the result or the error of the call."""
+        try:
+            sink.record(self.metrics(total_seconds, error))
+        except Exception as exception:
+            warnings.warn(
+                f"{sink!r} failed to record metrics: {exception!r}.", RuntimeWarning, stacklevel=3)
+
+
+class MetricsSink(ABC):
+    """Receives the metrics of every instrumented parser call. Subclasses implement record."""
+
+    @abstractmethod
+    def record(self, metrics: ParseMetrics) -> None:
+        """Record the metrics of one call. Exceptions it raises are turned into warnings."""
+
+
+class CallbackSink(MetricsSink):
+    """Calls a function with the metrics of every call."""
+
+    def __init__(self, callback: Callable[[ParseMetrics], Any]) -> None:
+        """
+        callback: represents the function called with every ParseMetrics.
+            type: callable
+        """
+        if not callable(callback):
+            raise TypeError(
+                f"callback has to be callable. {callback} is {type(callback)}.")
+        self.callback = callback
+
+    def __repr__(self) -> str:
+        return f"CallbackSink({self.callback!r})"
+
+    def record(self, metrics: ParseMetrics) -> None:
+        self.callback(metrics)
+
+
+def _percentile(ordered: List[float], percentile: float) -> float:
+    """Nearest rank percentile of sorted values."""
+    rank = max(math.ceil(percentile / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+class AggregatingSink(MetricsSink):
+    """Thread safe in-memory aggregation of metrics by operation, with percentiles over the most recent calls."""
+
+    def __init__(self, maxsize: int = 10000) -> None:
+        """
+        maxsize: represents the number of most recent calls of every operation kept for percentiles.
+            type: int
+            default: 10000
+        """
+        if not isinstance(maxsize, int) or maxsize < 1:
+            raise TypeError(
+                f"maxsize has to be a positive int. {maxsize} is {type(maxsize)}.")
+        self._maxsize = maxsize
+        self._lock = threading.Lock()
+        self.clear()
+
+    def __repr__(self) -> str:
+        return f"AggregatingSink(maxsize={self._maxsize})"
+
+    def record(self, metrics: ParseMetrics) -> None:
+        with self._lock:
+            samples = self._samples.get(metrics.operation)
+            if samples is None:
+                samples = self._samples[metrics.operation] = deque(maxlen=self._maxsize)
+            samples.append(metrics)
+            self._calls[metrics.operation] = self._calls.get(metrics.operation, 0) + 1
+            if metrics.error is not None:
+                key = (metrics.operation, metrics.error)
+                self._errors[key] = self._errors.get(key, 0) + 1
+
+    def clear(self) -> None:
+        """Drop all recorded metrics."""
+        with self._lock:
+            self._samples: Dict[str, deque] = {}
+            self._calls: Dict[str, int] = {}
+            self._errors: Dict[Tuple[str, str], int] = {}
+
+    def summary(self, percentiles: Iterable[float] = (50, 90, 99)) -> Dict[str, Dict[str, Any]]:
+        """Return, by operation, the number of calls, errors by exception type, and the percentiles of every phase
+        duration, tokens count, operators stack depth and brackets nesting over the most recent calls."""
+        with self._lock:
+            samples = {operation: list(metrics) for operation, metrics in self._samples.items()}
+            calls = dict(self._calls)
+            errors = dict(self._errors)
+        summary = {}
+        for operation, metrics in samples.items():
+            result = {"calls": calls[operation], "errors": {error: count for (name, error), count in errors.items() if name == operation}}
+            for field in _phases + ("tokens", "max_stack_depth", "max_nesting"):
+                values = sorted(getattr(m, field) for m in metrics if getattr(m, field) is not None)
+                if values:
+                    result[field] = {f"p{percentile:g}": _percentile(values, percentile) for percentile in percentiles}
+            summary[operation] = result
+        return summary
+
+
+class PrometheusSink(MetricsSink):
+    """Aggregates metrics and writes them to a file in the Prometheus text format, for a node exporter textfile collector
+    or any scraper that reads local files. The file is replaced atomically."""
+
+    buckets = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+    def __init__(self, path: str, *, interval: float = 10.0, prefix: str = "expression_parser") -> None:
+        """
+        path: represents the file the metrics are written to.
+            type: str
+        interval: represents the minimum number of seconds between two writes. 0 writes after every call.
+            type: float
+            default: 10.0
+        prefix: represents the metrics names prefix.
+            type: str
+            default: expression_parser
+        """
+        self.path = path
+        self.interval = interval
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._last_write = -math.inf
+        self._calls: Dict[str, int] = {}
+        self._errors: Dict[Tuple[str, str], int] = {}
+        self._tokens: Dict[str, int] = {}
+        self._seconds: Dict[Tuple[str, str], float] = {}
+        self._total_seconds: Dict[str, float] = {}
+        self._buckets: Dict[str, List[int]] = {}
+
+    def __repr__(self) -> str:
+        return f"PrometheusSink({self.path!r}, interval={self.interval})"
+
+    def record(self, metrics: ParseMetrics) -> None:
+        operation = metrics.operation
+        with self._lock:
+            self._calls[operation] = self._calls.get(operation, 0) + 1
+            if metrics.error is not None:
+                key = (operation, metrics.error)
+                self._errors[key] = self._errors.get(key, 0) + 1
+            if metrics.tokens is not None:
+                self._tokens[operation] = self._tokens.get(operation, 0) + metrics.tokens
+            for phase in _phases[:-1]:
+                seconds = getattr(metrics, phase)
+                if seconds is not None:
+                    key = (operation, phase[:-len("_seconds")])
+                    self._seconds[key] = self._seconds.get(key, 0.0) + seconds
+            self._total_seconds[operation] = self._total_seconds.get(operation, 0.0) + metrics.total_seconds
+            counts = self._buckets.setdefault(operation, [0] * len(self.buckets))
+            for i, bound in enumerate(self.buckets):
+                if metrics.total_seconds <= bound:
+                    counts[i] += 1
+            now = time.monotonic()
+            if now - self._last_write < self.interval:
+                return
+            self._last_write = now
+            text = self._render()
+        self._write(text)
+
+    def write(self) -> None:
+        """Write the current metrics now."""
+        with self._lock:
+            self._last_write = time.monotonic()
+            text = self._render()
+        self._write(text)
+
+    def _render(self) -> str:
+        prefix = self.prefix
+        lines = [f"# HELP {prefix}_calls_total Parser calls.", f"# TYPE {prefix}_calls_total counter"]
+        lines += [f'{prefix}_calls_total{{operation="{operation}"}} {count}' for operation, count in sorted(self._calls.items())]
+        lines += [f"# HELP {prefix}_errors_total Failed parser calls by exception type.", f"# TYPE {prefix}_errors_total counter"]
+        lines += [f'{prefix}_errors_total{{operation="{operation}",error="{error}"}} {count}' for (operation, error), count in sorted(self._errors.items())]
+        lines += [f"# HELP {prefix}_tokens_total Tokens of the parsed expressions.", f"# TYPE {prefix}_tokens_total counter"]
+        lines += [f'{prefix}_tokens_total{{operation="{operation}"}} {count}' for operation, count in sorted(self._tokens.items())]
+        lines += [f"# HELP {prefix}_phase_seconds_total Time spent in every parsing phase.", f"# TYPE {prefix}_phase_seconds_total counter"]
+        lines += [f'{prefix}_phase_seconds_total{{operation="{operation}",phase="{phase}"}} {seconds!r}' for (operation, phase), seconds in sorted(self._seconds.items())]
+        lines += [f"# HELP {prefix}_call_seconds Parser calls duration.", f"# TYPE {prefix}_call_seconds histogram"]
+        for operation, counts in sorted(self._buckets.items()):
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f'{prefix}_call_seconds_bucket{{operation="{operation}",le="{bound!r}"}} {count}')
+            lines.append(f'{prefix}_call_seconds_bucket{{operation="{operation}",le="+Inf"}} {self._calls[operation]}')
+            lines.append(f'{prefix}_call_seconds_sum{{operation="{operation}"}} {self._total_seconds[operation]!r}')
+            lines.append(f'{prefix}_call_seconds_count{{operation="{operation}"}} {self._calls[operation]}')
+        return "\n".join(lines) + "\n"
+
+    def _write(self, text: str) -> None:
+        # the file is replaced at once, so a scraper never reads a half written file.
+        temporary_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary_path, "w") as file:
+            file.write(text)
+        os.replace(temporary_path, self.path)
@@ -0,0 +1,170 @@
+import math
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from AlgebraicExpressionParser.exceptions.exceptions import InvalidExpressionException
+from AlgebraicExpressionParser.parser.literals import LiteralScanner
+
+
+# identifiers start with a letter or an underscore, followed by letters, digits and underscores.
+identifier_pattern = r"[^\W\d]\w*"
+
+# the escape makes the token after it an operand.
+escape_charcter = "$"
+
+
+def _read(chunks: Iterator[str], size: int) -> Optional[str]:
+    """Return at least size characters read from chunks, fewer only at their end. None if they are exhausted."""
+    parts = []
+    read_size = 0
+    for chunk in chunks:
+        parts.append(chunk)
+        read_size += len(chunk)
+        if read_size >= size:
+            break
+    return "".join(parts) if parts else None
+
+
+class Lexer:
+    """Maximal-munch tokenizer compiled once from a fixed set of symbols."""
+
+    def __init__(self, symbols: Iterable[str], literals: Optional[LiteralScanner] = None, identifiers: Optional["re.Pattern"] = None) -> None:
+        """
+        symbols: represents the tokens known upfront, like operators symbols, special variables and brackets.
+            Constants, one symbol variables and spaces are always recognized.
+            type: iterable of str
+        literals: represents the scanner of constants.
+            type: LiteralScanner
+            default: LiteralScanner()
+        identifiers: represents the pattern of variables names longer than one symbol. Identifiers compete with the
+            other tokens by length, so they can't be cut by symbols they contain. Any pattern other than
+            identifier_pattern may match differently once more text follows, so the lookahead becomes unbounded:
+            streams are buffered whole and session edits re-lex the text from its start.
+            type: re.Pattern
+            default: None
+        """
+        self._literals = literals if literals is not None else LiteralScanner()
+        self._identifiers = identifiers
+        self._transitions: List[Dict[str, int]] = [{}]
+        self._accepting: List[bool] = [False]
+        # the number of characters the lexer may read after a token before deciding on it, "inf" vs "infinity" needs 5.
+        self._lookahead: Union[int, float] = 8
+        for symbol in symbols:
+            self._add_symbol(symbol)
+        if identifiers is not None and identifiers.pattern != identifier_pattern:
+            # identifier_pattern matches whole runs of word characters, the text after a run can't change it.
+            self._lookahead = math.inf
+
+    @property
+    def lookahead(self) -> Union[int, float]:
+        """The number of characters after a token that can change it, math.inf if there is no bound."""
+        return self._lookahead
+
+    def _add_symbol(self, symbol: str) -> None:
+        state = 0
+        for c in symbol:
+            next_state = self._transitions[state].get(c)
+            if next_state is None:
+                next_state = len(self._transitions)
+                self._transitions[state][c] = next_state
+                self._transitions.append({})
+                self._accepting.append(False)
+            state = next_state
+        if state:
+            self._accepting[state] = True
+            self._lookahead = max(self._lookahead, len(symbol))
+
+    def _match_symbol(self, expression: str, start: int) -> int:
+        """Return the end of the longest symbol at start, start if there is none."""
+        transitions = self._transitions
+        accepting = self._accepting
+        sz = len(expression)
+        state = 0
+        end = idx = start
+        while idx < sz:
+            state = transitions[state].get(expression[idx])
+            if state is None:
+                break
+            idx += 1
+            if accepting[state]:
+                end = idx
+        return end
+
+    def match(self, expression: str, start: int) -> int:
+        """Return the end of the longest valid token at start, start if there is none."""
+        c = expression[start]
+        end = self._match_symbol(expression, start)
+        if c.isspace():
+            idx = start + 1
+            sz = len(expression)
+            while idx < sz and expression[idx].isspace():
+                idx += 1
+            return max(end, idx)
+        if c.isalpha():
+            end = max(end, start + 1)
+        if self._identifiers is not None:
+            match = self._identifiers.match(expression, start)
+            if match is not None:
+                end = max(end, match.end())
+        if c.isdecimal() or c == "." or c in "iInN":
+            end = max(end, self._literals.match(expression, start))
+        return end
+
+    def tokenize(self, expression: str) -> List[str]:
+        """Split the expression into tokens in one pass."""
+        idx = 0
+        sz = len(expression)
+        tokens = []
+        while idx < sz:
+            end = self.match(expression, idx)
+            if end == idx:
+                raise InvalidExpressionException(
+                    "expression is not valid.", offset=idx, token=expression[idx], expected="token")
+            tokens.append(expression[idx: end])
+            idx = end
+        return tokens
+
+    def scan(self, expression: str) -> Iterator[Tuple[int, int, bool]]:
+        """Yield (start, end, is_valid) for every token of the expression without raising. Characters that can't
+        start a token are yielded one by one as invalid."""
+        idx = 0
+        sz = len(expression)
+        while idx < sz:
+            end = self.match(expression, idx)
+            if end == idx:
+                yield idx, idx + 1, False
+                idx += 1
+            else:
+                yield idx, end, True
+                idx = end
+
+    def iter_tokenize(self, chunks: Iterable[str]) -> Iterator[str]:
+        """Split an expression given as consecutive text chunks into tokens lazily.
+        Only the current chunk and the characters that can still change the next token are kept in memory."""
+        chunks = iter(chunks)
+        buffer = ""
+        idx = 0
+        # the number of characters dropped from the buffer start, to report errors offsets.
+        consumed = 0
+        is_exhausted = False
+        while True:
+            end = None
+            if is_exhausted or len(buffer) - idx > self._lookahead:
+                if idx >= len(buffer):
+                    return
+                end = self.match(buffer, idx)
+                if is_exhausted or len(buffer) - end > self._lookahead:
+                    if end == idx:
+                        raise InvalidExpressionException(
+                            "expression is not valid.", offset=consumed + idx, token=buffer[idx], expected="token")
+                    yield buffer[idx: end]
+                    idx = end
+                    continue
+            # the next token may go on in the next chunks. Reading as much as the kept text keeps long tokens linear.
+            text = _read(chunks, 1 if end is None else len(buffer) - idx)
+            if text is None:
+                is_exhausted = True
+            else:
+                buffer = buffer[idx:] + text
+                consumed += idx
+                idx = 0
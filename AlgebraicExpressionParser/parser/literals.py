@@ -0,0 +1,110 @@
+import re
+from decimal import Decimal
+from typing import Any, Optional, Tuple, Union
+
+
+class LiteralScanner:
+    """Recognizes numeric literals in one forward scan, without raising, and converts them into numbers.
+
+    The default configuration accepts what float() accepts without a sign or spaces: integers, decimals, exponents,
+    single underscores between digits, and inf, infinity and nan in any case. Scanners are immutable, assign a new one
+    to the parser to change its literals.
+    """
+
+    auto_values = "auto"
+    float_values = "float"
+    decimal_values = "decimal"
+
+    __slots__ = ("decimals", "exponents", "underscores", "hexadecimal", "special_values", "values", "_pattern")
+
+    def __init__(self, decimals: bool = True, exponents: bool = True, underscores: bool = True, hexadecimal: bool = False, special_values: bool = True, values: Optional[str] = None) -> None:
+        """
+        decimals: represents whether literals can have a fraction, like 1.5, .5 or 1.
+            type: bool
+            default: True
+        exponents: represents whether literals can have an exponent, like 1e5 or 2.5E-3.
+            type: bool
+            default: True
+        underscores: represents whether single underscores are allowed between digits, like 1_000.
+            type: bool
+            default: True
+        hexadecimal: represents whether hexadecimal integers are recognized, like 0x1F.
+            type: bool
+            default: False
+        special_values: represents whether inf, infinity and nan are literals.
+            type: bool
+            default: True
+        values: represents what the parser yields for literals in postfix forms and trees: None for their tokens,
+            LiteralScanner.auto_values for int for integers and float for the others, LiteralScanner.float_values for float and
+            LiteralScanner.decimal_values for decimal.Decimal.
+            type: str
+            default: None
+        """
+        for name, value in (("decimals", decimals), ("exponents", exponents), ("underscores", underscores), ("hexadecimal", hexadecimal), ("special_values", special_values)):
+            if not isinstance(value, bool):
+                raise TypeError(
+                    f"{name} has to be bool. {value} is {type(value)}.")
+        if values not in (None, LiteralScanner.auto_values, LiteralScanner.float_values, LiteralScanner.decimal_values):
+            raise TypeError(
+                f"values has to be None, {LiteralScanner.auto_values}, {LiteralScanner.float_values} or {LiteralScanner.decimal_values}. {values} is {type(values)}.")
+        for name, value in (("decimals", decimals), ("exponents", exponents), ("underscores", underscores), ("hexadecimal", hexadecimal), ("special_values", special_values), ("values", values)):
+            object.__setattr__(self, name, value)
+        object.__setattr__(self, "_pattern", self._compile())
+
+    def _compile(self) -> "re.Pattern":
+        digits = r"\d+(?:_\d+)*" if self.underscores else r"\d+"
+        alternatives = []
+        if self.hexadecimal:
+            hex_digits = r"[0-9a-fA-F]+(?:_[0-9a-fA-F]+)*" if self.underscores else r"[0-9a-fA-F]+"
+            alternatives.append(rf"(?P<hexadecimal>0[xX]{hex_digits})")
+        if self.special_values:
+            alternatives.append(r"(?P<special>(?i:infinity|inf|nan))")
+        number = rf"{digits}(?P<fraction>\.(?:{digits})?)?|(?P<bare_fraction>\.{digits})" if self.decimals else digits
+        exponent = rf"(?P<exponent>[eE][+-]?{digits})?" if self.exponents else ""
+        alternatives.append(rf"(?:{number}){exponent}")
+        # alternatives are tried in order, hexadecimal first so 0x1F isn't matched as 0.
+        return re.compile("|".join(alternatives))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(
+            "literal scanners are immutable.")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(
+            "literal scanners are immutable.")
+
+    def __reduce__(self) -> Tuple[Any, Tuple[Any, ...]]:
+        return (LiteralScanner, (self.decimals, self.exponents, self.underscores, self.hexadecimal, self.special_values, self.values))
+
+    def __repr__(self) -> str:
+        return (f"LiteralScanner(decimals={self.decimals}, exponents={self.exponents}, underscores={self.underscores}, "
+                f"hexadecimal={self.hexadecimal}, special_values={self.special_values}, values={self.values!r})")
+
+    def match(self, expression: str, start: int) -> int:
+        """Return the end of the longest literal at start, start if there is none."""
+        match = self._pattern.match(expression, start)
+        return match.end() if match is not None else start
+
+    def is_literal(self, token: str) -> bool:
+        """Return whether the whole token is a literal."""
+        # plain integers, the most common literals, are literals in every configuration.
+        return token.isdecimal() or self._pattern.fullmatch(token) is not None
+
+    def convert(self, token: str) -> Union[int, float, Decimal]:
+        """Return the value of a literal token, as configured by values. Tokens that aren't literals raise ValueError."""
+        match = self._pattern.fullmatch(token)
+        if match is None:
+            raise ValueError(
+                f"{token!r} is not a literal.")
+        values = self.values
+        if self.hexadecimal and match.group("hexadecimal") is not None:
+            value = int(token, 16)
+            if values == LiteralScanner.float_values:
+                return float(value)
+            return Decimal(value) if values == LiteralScanner.decimal_values else value
+        if values == LiteralScanner.decimal_values:
+            return Decimal(token)
+        if values == LiteralScanner.auto_values and match.lastgroup is None:
+            # no fraction, exponent or special value.
+            return int(token)
+        return float(token)
@@ -1,12 +1,43 @@
-from typing import Any, List, Optional
+from collections import deque
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+def _value_key(value: Any) -> Tuple[type, Any]:
+    """Return the key node values are interned by. Equal values of different types or representations, like 1 and 1.0,
+    0.0 and -0.0 or Decimal('1.0') and Decimal('1.00'), get different keys."""
+    value_type = type(value)
+    if value_type is float or value_type is Decimal:
+        return (value_type, repr(value))
+    return (value_type, value)
 
 
 class Node:
+    __slots__ = ("value", "_left", "_right")
+
     def __init__(self, value: Any, *, left: Optional["Node"] = None, right: Optional["Node"] = None) -> None:
         self.value = value
         self.left = left
         self.right = right
 
+    @classmethod
+    def _make(cls, value: Any, left: Optional["Node"] = None, right: Optional["Node"] = None) -> "Node":
+        """Construct a node without validating its children. Children have to be Node instances or None."""
+        node = cls.__new__(cls)
+        node.value = value
+        node._left = left
+        node._right = right
+        return node
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # the same state as the __dict__ the previous release pickled, so old and new pickles load alike.
+        return {"value": self.value, "_left": self._left, "_right": self._right}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.value = state["value"]
+        self._left = state.get("_left")
+        self._right = state.get("_right")
+
     @property
     def left(self) -> "Node":
         return self._left
@@ -37,38 +68,63 @@ class Node:
     def __repr__(self) -> str:
         return f"Node(value={self.value}, left={self.left}, right={self.right})"
 
-    def _preorder(self, root: "Node", result: List) -> None:
-        if not root:
-            return
-        result.append(root.value)
-        self._preorder(root.left, result)
-        self._preorder(root.right, result)
-
-    def _inorder(self, root: "Node", result: List) -> None:
-        if not root:
-            return
-        self._inorder(root.left, result)
-        result.append(root.value)
-        self._inorder(root.right, result)
-
-    def _postorder(self, root: "Node", result: List) -> None:
-        if not root:
-            return
-        self._postorder(root.left, result)
-        self._postorder(root.right, result)
-        result.append(root.value)
+    def iter_preorder(self, *, nodes: bool = False) -> Iterator[Any]:
+        """Yield the tree values in preorder, or the nodes themselves if nodes is True."""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node if nodes else node.value
+            if node._right is not None:
+                stack.append(node._right)
+            if node._left is not None:
+                stack.append(node._left)
+
+    def iter_inorder(self, *, nodes: bool = False) -> Iterator[Any]:
+        """Yield the tree values in inorder, or the nodes themselves if nodes is True."""
+        stack = []
+        node = self
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node._left
+            node = stack.pop()
+            yield node if nodes else node.value
+            node = node._right
+
+    def iter_postorder(self, *, nodes: bool = False) -> Iterator[Any]:
+        """Yield the tree values in postorder, or the nodes themselves if nodes is True."""
+        # nodes are pushed again once their children are, so children that are the same node are both visited.
+        stack = [(self, False)]
+        while stack:
+            node, are_children_visited = stack.pop()
+            if are_children_visited:
+                yield node if nodes else node.value
+                continue
+            stack.append((node, True))
+            if node._right is not None:
+                stack.append((node._right, False))
+            if node._left is not None:
+                stack.append((node._left, False))
+
+    def iter_level_order(self, *, nodes: bool = False) -> Iterator[Any]:
+        """Yield the tree values level by level from left to right, or the nodes themselves if nodes is True."""
+        queue = deque([self])
+        while queue:
+            node = queue.popleft()
+            yield node if nodes else node.value
+            if node._left is not None:
+                queue.append(node._left)
+            if node._right is not None:
+                queue.append(node._right)
 
     def preorder(self) -> List["Node"]:
-        result = []
-        self._preorder(self, result)
-        return result
+        return list(self.iter_preorder())
 
     def inorder(self) -> List["Node"]:
-        result = []
-        self._inorder(self, result)
-        return result
+        return list(self.iter_inorder())
 
     def postorder(self) -> List["Node"]:
-        result = []
-        self._postorder(self, result)
-        return result
+        return list(self.iter_postorder())
+
+    def level_order(self) -> List["Node"]:
+        return list(self.iter_level_order())
@@ -1,9 +1,11 @@
 import copy
-from typing import List, Optional, Set, Union
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Set, Tuple, Union
 
 
 class Operator:
-    """Operator rules holder"""
+    """Operator rules holder. Rules can't be changed once the operator is added to Operators, whose compiled grammar
+    depends on them. copy.copy gives a changeable copy."""
 
     prefix = "prefix"
     infix = "infix"
@@ -42,6 +44,7 @@ class Operator:
 
     @symbol.setter
     def symbol(self, symbol: str) -> None:
+        self._check_changeable()
         if not isinstance(symbol, str):
             raise TypeError(
                 f"Invalid operator symbol. It has to be str.")
@@ -53,6 +56,7 @@ class Operator:
 
     @type.setter
     def type(self, type: int) -> None:
+        self._check_changeable()
         if not type in [self.unary, self.binary]:
             raise TypeError(
                 f"Invalid operator type.")
@@ -64,6 +68,7 @@ class Operator:
 
     @precedence.setter
     def precedence(self, precedence: int) -> None:
+        self._check_changeable()
         if not isinstance(precedence, int):
             raise TypeError(
                 f"Invalid operator precedence. It has to be int.")
@@ -75,6 +80,7 @@ class Operator:
 
     @associativity.setter
     def associativity(self, associativity: str) -> None:
+        self._check_changeable()
         if not associativity in [self.ltr, self.rtl]:
             raise TypeError(
                 f"Invalid operator associativity.")
@@ -86,11 +92,26 @@ class Operator:
 
     @position.setter
     def position(self, position: str) -> None:
+        self._check_changeable()
         if not position in [self.prefix, self.infix, self.postfix]:
             raise TypeError(
                 f"Invalid operator position.")
         self._position = position
 
+    def _check_changeable(self) -> None:
+        if self.__dict__.get("_is_indexed"):
+            raise AttributeError(
+                f"operator {self._symbol!r} rules can't be changed after it is added to Operators. Add a changed copy instead.")
+
+    def __getstate__(self) -> Tuple[str, int, int, str, str]:
+        return (self.symbol, self.type, self.precedence, self.associativity, self.position)
+
+    def __setstate__(self, state: Union[Tuple[str, int, int, str, str], Dict[str, Any]]) -> None:
+        if isinstance(state, dict):
+            # the previous release pickled the __dict__ of operators.
+            state = (state["_symbol"], state["_type"], state["_precedence"], state["_associativity"], state["_position"])
+        self.symbol, self.type, self.precedence, self.associativity, self.position = state
+
     def __str__(self) -> str:
         return f"symbol: {self.symbol}\ntype: {self.type}\nprecedence: {self.precedence}\nassociativity: {self.associativity}\nposition: {self.position}"
 
@@ -98,19 +119,85 @@ class Operator:
         return f"Operator(symbol='{self.symbol}', type={self.type}, precedence={self.precedence}, associativity='{self.associativity}')"
 
 
+class Grammar:
+    """Immutable compiled form of operators rules, the parser runs on its small int rule ids.
+
+    Every reachable rule gets an id, its index in rules. Symbols resolve to a rule id, with or without an operand before
+    them, and the pop table tells whether an operator on the stack is popped by an incoming one. Changing operators
+    compiles a new grammar, grammars compiled earlier keep working with the old rules.
+    """
+
+    __slots__ = ("rules", "resolutions", "pops", "leaves_operand", "bracket")
+
+    def __init__(self, unary_binary_rules: Mapping[str, Tuple[Optional[Operator], Optional[Operator]]]) -> None:
+        """
+        unary_binary_rules: represents the unary and the binary rules of every operator symbol, None for the missing ones.
+            type: dict
+        """
+        rules = []
+        resolutions = {}
+        for symbol in sorted(unary_binary_rules):
+            unary_rule, binary_rule = unary_binary_rules[symbol]
+            # the first id is used without an operand before the symbol, the second one after an operand.
+            resolution = [-1, -1]
+            if binary_rule is not None:
+                resolution[1] = len(rules)
+                rules.append(binary_rule)
+            if unary_rule is not None and unary_rule.position in (Operator.prefix, Operator.postfix):
+                # a matching unary rule wins over the binary one.
+                resolution[unary_rule.position == Operator.postfix] = len(rules)
+                rules.append(unary_rule)
+            resolutions[symbol] = tuple(resolution)
+        # the pop table has one more row for the brackets marker, which is never popped by operators.
+        pops = [bytes(Operators.does_have_higher_precedence(top, rule) for rule in rules) for top in rules]
+        pops.append(bytes(len(rules)))
+        object.__setattr__(self, "rules", tuple(rules))
+        object.__setattr__(self, "resolutions", MappingProxyType(resolutions))
+        object.__setattr__(self, "pops", tuple(pops))
+        object.__setattr__(self, "leaves_operand", tuple(rule.type == Operator.unary and rule.position == Operator.postfix for rule in rules))
+        object.__setattr__(self, "bracket", len(rules))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(
+            f"Grammar is immutable, change the operators to get a new one.")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(
+            f"Grammar is immutable, change the operators to get a new one.")
+
+    def __str__(self) -> str:
+        return f"grammar: {self.rules}"
+
+    def __repr__(self) -> str:
+        return f"Grammar({len(self.rules)} rules)"
+
+    def resolve(self, symbol: str, is_previous_character_operand: bool) -> int:
+        """Return the id of the rule the symbol has at this position, -1 if it can't be there."""
+        resolution = self.resolutions.get(symbol)
+        return -1 if resolution is None else resolution[is_previous_character_operand]
+
+    def does_pop(self, top: int, rule: int) -> bool:
+        """Return True if the rule top, on the operators stack, is popped by the incoming rule."""
+        return bool(self.pops[top][rule])
+
+
 class Operators:
-    """Operators holder"""
+    """Operators holder. Operators are indexed when they are added, so Operator objects can't be changed after that,
+    add a new Operator or assign new operators instead."""
 
     def __init__(self, operators: Union[List[Operator], Set[Operator]]) -> None:
         """
         operators: list of Operator instances that holds operators symbols and rules.
             type: list or set
         """
+        self._version = 0
+        self._grammar = None
         self.operators = operators
 
     @property
-    def operators(self) -> List[Operator]:
-        return self._operators
+    def operators(self) -> FrozenSet[Operator]:
+        # a frozenset, so operators are only added through add_operator and the setter, which index them.
+        return frozenset(self._operators)
 
     @operators.setter
     def operators(self, operators: Union[List[Operator], Set[Operator]]) -> None:
@@ -118,65 +205,129 @@ class Operators:
             raise TypeError(
                 f"operators has to be list. {operators} is {type(operators)}.")
         self._operators = set(copy.copy(operators))
+        self._version += 1
         self._validate()
+        self._index()
+
+    def __getstate__(self) -> List[Operator]:
+        # the indexes are rebuilt instead of being pickled.
+        return list(self._operators)
+
+    def __setstate__(self, operators: Union[List[Operator], Dict[str, Any]]) -> None:
+        if isinstance(operators, dict):
+            # the previous release pickled the __dict__ of operators holders.
+            operators = list(operators["_operators"])
+        self._version = 0
+        self._grammar = None
+        self.operators = operators
 
     def __str__(self) -> str:
-        return f"operators: {self.operators}"
+        return f"operators: {self._operators}"
 
     def __repr__(self) -> str:
-        return f"Operators({self.operators})"
+        return f"Operators({self._operators})"
+
+    @property
+    def version(self) -> int:
+        """Counter that changes whenever the operators are replaced or added."""
+        return self._version
+
+    @property
+    def grammar(self) -> Grammar:
+        """Compiled grammar of the current operators. It is compiled again after the operators change."""
+        # the grammar is stored with its version in one tuple, so threads never see a mismatched pair.
+        if self._grammar is None or self._grammar[0] != self._version:
+            self._grammar = (self._version, Grammar(self._symbols_unary_binary_rules))
+        return self._grammar[1]
 
     def _validate(self) -> bool:
-        for operator in self.operators:
+        for operator in self._operators:
             if not isinstance(operator, Operator):
                 raise TypeError(
                     f"operators has to be list of Operator instances. {operator} is {type(operator)}.")
         return True
 
+    def _index(self) -> None:
+        """Build the symbol lookup tables from scratch."""
+        self._symbols_rules: Dict[str, Set[Operator]] = {}
+        self._symbols_unary_binary_rules: Dict[str, Tuple[Optional[Operator], Optional[Operator]]] = {}
+        self._binary_symbols: Set[str] = set()
+        self._unary_symbols: Set[str] = set()
+        self._max_symbol_length = 0
+        for operator in self._operators:
+            self._index_operator(operator)
+
+    def _index_operator(self, operator: Operator) -> None:
+        # the grammar and the indexes are built from the operator rules, so they can't change from now on.
+        operator._is_indexed = True
+        symbol = operator.symbol
+        self._symbols_rules.setdefault(symbol, set()).add(operator)
+        unary_rule, binary_rule = self._symbols_unary_binary_rules.get(symbol, (None, None))
+        if operator.type == Operator.unary:
+            unary_rule = operator
+            self._unary_symbols.add(symbol)
+        if operator.type == Operator.binary:
+            binary_rule = operator
+            self._binary_symbols.add(symbol)
+        self._symbols_unary_binary_rules[symbol] = (unary_rule, binary_rule)
+        self._max_symbol_length = max(self._max_symbol_length, len(symbol))
+
     def add_operator(self, operator: Operator) -> None:
         if not isinstance(operator, Operator):
             raise TypeError(
                 f"operator has to be Operator instance. {operator} is {type(operator)}.")
-        self.operators.add(operator)
+        self._operators.add(operator)
+        self._version += 1
+        self._index_operator(operator)
+
+    @property
+    def max_symbol_length(self) -> int:
+        """Length of the longest operator symbol."""
+        return self._max_symbol_length
 
     def get_operators(self) -> Set[Operator]:
         """Return set that contains all operators."""
-        return {operator for operator in self.operators}
+        return {operator for operator in self._operators}
 
     def get_operators_symbol(self) -> Set[str]:
         """Return set that contains all operators symbols."""
-        return {operator.symbol for operator in self.operators}
+        return set(self._symbols_rules)
 
     def get_binary_operators_symbols(self) -> Set[str]:
         """Return set that contains all binary operators symbols."""
-        return {operator.symbol for operator in self.operators if operator.type == Operator.binary}
+        return set(self._binary_symbols)
 
     def get_binary_operators(self) -> Set[Operator]:
         """Return set that contains all binary operators."""
-        return {operator for operator in self.operators if operator.type == Operator.binary}
+        return {operator for operator in self._operators if operator.type == Operator.binary}
 
     def get_unary_operators_symbols(self) -> Set[str]:
         """Return set that contains all unary operators symbols."""
-        return {operator.symbol for operator in self.operators if operator.type == Operator.unary}
+        return set(self._unary_symbols)
 
     def get_unary_operators(self) -> Set[Operator]:
         """Return set that contains all unary operators."""
-        return {operator for operator in self.operators if operator.type == Operator.unary}
-    
+        return {operator for operator in self._operators if operator.type == Operator.unary}
+
     def is_operator(self, c: str) -> bool:
-        return c in self.get_operators_symbol()
+        return c in self._symbols_rules
 
     def is_binary_operator(self, c: str) -> bool:
-        return c in self.get_binary_operators_symbols()
+        return c in self._binary_symbols
 
     def is_unary_operator(self, c: str) -> bool:
-        return c in self.get_unary_operators_symbols()
+        return c in self._unary_symbols
 
     def get_operator_rules(self, c: str) -> Set[Operator]:
         """Return all operator rules. There are Some operator has many rules, like '-', it may be minus or negative."""
-        return {operator for operator in self.operators if operator.symbol == c}
+        return set(self._symbols_rules.get(c, ()))
+
+    def get_unary_binary_rules(self, c: str) -> Tuple[Optional[Operator], Optional[Operator]]:
+        """Return the unary and the binary rules of the operator symbol, None for the missing ones."""
+        return self._symbols_unary_binary_rules.get(c, (None, None))
 
-    def does_have_higher_precedence(self, operator1: Operator, operator2: Operator) -> bool:
+    @staticmethod
+    def does_have_higher_precedence(operator1: Operator, operator2: Operator) -> bool:
         # if operator1.precedence == operator2.precedence:
         #     return operator1.associativity == Operator.ltr
         # return operator1.precedence > operator2.precedence
@@ -1,28 +1,125 @@
-from typing import List, Set, Tuple, Union
-from collections import deque
-import copy
+from typing import Any, Callable, Dict, FrozenSet, Hashable, Iterable, Iterator, List, Optional, Set, Tuple, Union
+from collections import deque, namedtuple
+import itertools
+import re
+import time
 
 from AlgebraicExpressionParser.exceptions.exceptions import *
 from AlgebraicExpressionParser.parser.operators import Operators, Operator
 from AlgebraicExpressionParser.parser.node import Node
-
-
-escape_charcter = "$"
+from AlgebraicExpressionParser.parser.flat_tree import FlatTree
+from AlgebraicExpressionParser.parser.dag import DagNode, NodeTable
+from AlgebraicExpressionParser.parser.lexer import Lexer, escape_charcter, identifier_pattern
+from AlgebraicExpressionParser.parser.literals import LiteralScanner
+from AlgebraicExpressionParser.parser.cache import ParseCache
+from AlgebraicExpressionParser.parser.batch import BatchResult, parse_many
+from AlgebraicExpressionParser.parser.stream import iter_chunks
+from AlgebraicExpressionParser.parser.incremental import ParseSession
+from AlgebraicExpressionParser.parser.instrumentation import CallbackSink, MetricsSink, _Recorder
+from AlgebraicExpressionParser.parser.aio import AsyncParser
+
+
+ParseResult = namedtuple("ParseResult", ["postfix", "syntax_tree", "variables"])
+ParseResult.__doc__ = """Result of parse(). variables maps every variable name to the offsets of its occurrences, in order of first
+occurrence. syntax_tree is None unless it was asked for."""
+
+
+def _invalid_expression(index: int, token: Optional[str], expected: Optional[str]) -> InvalidExpressionException:
+    """Return the error of the token at index. The parser turns indexes into offsets."""
+    error = InvalidExpressionException(
+        "expression is not valid.", token=token, expected=expected)
+    error._index = index
+    return error
+
+
+def _unbalanced_parentheses(index: int, token: Optional[str], expected: Optional[str], bracket_index: int) -> InvalidParenthesesException:
+    error = InvalidParenthesesException(
+        "expression's parenthesis are not balanced.", token=token, expected=expected)
+    error._index = index
+    error._bracket_index = bracket_index
+    return error
+
+
+class _StreamOffsets:
+    """Keeps the offsets needed to locate the errors of a streamed expression: the last token offset, the expression
+    length and the offsets of the open brackets, so memory is bounded by brackets nesting."""
+
+    __slots__ = ("parser", "index", "offset", "end", "brackets")
+
+    def __init__(self, parser: "ExpressionParser") -> None:
+        self.parser = parser
+        self.index = -1
+        self.offset = self.end = 0
+        self.brackets: List[Tuple[int, int]] = []
+
+    def track(self, tokens: Iterable[str]) -> Iterator[str]:
+        parser = self.parser
+        brackets = self.brackets
+        is_escaped = is_closed = False
+        for token in tokens:
+            # a closed bracket is dropped on the next token, a mismatched one is still needed by the error.
+            if is_closed and brackets:
+                brackets.pop()
+            is_closed = False
+            self.index += 1
+            self.offset = self.end
+            self.end += len(token)
+            if is_escaped:
+                is_escaped = False
+            elif token == escape_charcter:
+                is_escaped = True
+            elif parser.is_open_bracket(token):
+                brackets.append((self.index, self.offset))
+            elif parser.is_close_bracket(token):
+                is_closed = True
+            yield token
+
+    def offset_of(self, index: int) -> Optional[int]:
+        if index == self.index:
+            return self.offset
+        if index > self.index:
+            return self.end
+        for bracket_index, offset in reversed(self.brackets):
+            if bracket_index == index:
+                return offset
+        return None
 
 
 class ExpressionParser:
     """Algebraic expression parser."""
 
-    def __init__(self, operators: Operators, *, special_variables: Union[List[str], Set[str]] = set()) -> None:
+    def __init__(self, operators: Operators, *, special_variables: Union[List[str], Set[str], FrozenSet[str]] = set(), cache_size: int = 0, sink: Optional[Union[MetricsSink, Callable]] = None, literals: Optional[LiteralScanner] = None, identifiers: Union[None, bool, str, "re.Pattern"] = None) -> None:
         """
         operators: represents operators rules.
             type: Operators
         special_variables: represents variables other than predefined ones(constants and one symbol variables).
             type: list or set
             default: empty set {}
+        cache_size: represents the maximum number of expressions whose parse results are cached. 0 disables the cache.
+            type: int
+            default: 0
+        sink: represents where the metrics of every tokenize, postfix and syntax tree call are sent. A callable is called
+            with every ParseMetrics. None disables instrumentation.
+            type: MetricsSink or callable
+            default: None
+        literals: represents the scanner of constants, and whether they are yielded as numbers.
+            type: LiteralScanner
+            default: LiteralScanner()
+        identifiers: represents the pattern of variables names longer than one character, like temp_sensor_12. True
+            uses identifier_pattern, None only allows one character variables and special variables. The longest token
+            wins, so 'sinx' is one variable even if 'sin' is an operator, and operators win ties.
+            type: bool, str or re.Pattern
+            default: None
         """
+        self._lexer = None
+        self._configuration_version = 0
         self.operators = operators
         self.special_variables = special_variables
+        self.literals = literals if literals is not None else LiteralScanner()
+        self.identifiers = identifiers
+        self.cache_size = cache_size
+        self.sink = sink
+        self._async_parser = None
 
     @property
     def operators(self) -> Operators:
@@ -34,17 +131,121 @@ class ExpressionParser:
             raise TypeError(
                 f"operators has to be an Operators instance. {operators} is {type(operators)}.")
         self._operators = operators
+        self._configuration_version += 1
 
     @property
-    def special_variables(self) -> Operators:
+    def special_variables(self) -> FrozenSet[str]:
+        """The special variables. They are frozen because the lexer is only rebuilt when they are assigned, add ones by
+        assigning parser.special_variables | {'name'}."""
         return self._special_variables
 
     @special_variables.setter
-    def special_variables(self, special_variables: Union[List[str], Set[str]]) -> None:
-        if not isinstance(special_variables, (set, list)):
+    def special_variables(self, special_variables: Union[List[str], Set[str], FrozenSet[str]]) -> None:
+        if not isinstance(special_variables, (set, frozenset, list)):
             raise TypeError(
                 f"special_variables has to be a set. {special_variables} is {type(special_variables)}.")
-        self._special_variables = set(copy.copy(special_variables))
+        self._special_variables = frozenset(special_variables)
+        self._configuration_version += 1
+
+    @property
+    def literals(self) -> LiteralScanner:
+        return self._literals
+
+    @literals.setter
+    def literals(self, literals: LiteralScanner) -> None:
+        if not isinstance(literals, LiteralScanner):
+            raise TypeError(
+                f"literals has to be a LiteralScanner instance. {literals} is {type(literals)}.")
+        self._literals = literals
+        self._configuration_version += 1
+
+    @property
+    def identifiers(self) -> Optional["re.Pattern"]:
+        return self._identifiers
+
+    @identifiers.setter
+    def identifiers(self, identifiers: Union[None, bool, str, "re.Pattern"]) -> None:
+        if identifiers is True:
+            identifiers = identifier_pattern
+        if identifiers is None or identifiers is False:
+            identifiers = None
+        elif isinstance(identifiers, str):
+            identifiers = re.compile(identifiers)
+        elif not isinstance(identifiers, re.Pattern):
+            raise TypeError(
+                f"identifiers has to be bool, str or re.Pattern. {identifiers} is {type(identifiers)}.")
+        self._identifiers = identifiers
+        self._configuration_version += 1
+
+    @property
+    def cache_size(self) -> int:
+        return self._cache.maxsize if self._cache is not None else 0
+
+    @cache_size.setter
+    def cache_size(self, cache_size: int) -> None:
+        if not isinstance(cache_size, int) or cache_size < 0:
+            raise TypeError(
+                f"cache_size has to be a non negative int. {cache_size} is {type(cache_size)}.")
+        self._cache = ParseCache(cache_size) if cache_size else None
+
+    @property
+    def cache(self) -> Optional[ParseCache]:
+        """The parse cache, None if caching is disabled."""
+        return self._cache
+
+    @property
+    def sink(self) -> Optional[MetricsSink]:
+        return self._sink
+
+    @sink.setter
+    def sink(self, sink: Optional[Union[MetricsSink, Callable]]) -> None:
+        if sink is not None and not isinstance(sink, MetricsSink):
+            if not callable(sink):
+                raise TypeError(
+                    f"sink has to be a MetricsSink instance or callable. {sink} is {type(sink)}.")
+            sink = CallbackSink(sink)
+        self._sink = sink
+
+    @property
+    def async_parser(self) -> AsyncParser:
+        """The AsyncParser used by apostfix and asyntax_tree. Assign a new one to change its limits."""
+        if self._async_parser is None:
+            self._async_parser = AsyncParser(self)
+        return self._async_parser
+
+    @async_parser.setter
+    def async_parser(self, async_parser: AsyncParser) -> None:
+        if not isinstance(async_parser, AsyncParser) or async_parser.parser is not self:
+            raise TypeError(
+                f"async_parser has to be an AsyncParser instance of this parser. {async_parser} is {type(async_parser)}.")
+        self._async_parser = async_parser
+
+    def _observe(self, operation: str, expression: str, run: Callable[[_Recorder], Any]) -> Any:
+        """Run an operation with a recorder and send its metrics to the sink, even if it fails."""
+        recorder = _Recorder(operation, expression)
+        error = None
+        start = time.perf_counter()
+        try:
+            return run(recorder)
+        except Exception as exception:
+            error = exception
+            raise
+        finally:
+            recorder.send(self._sink, time.perf_counter() - start, error)
+
+    def _fingerprint(self) -> Hashable:
+        """Return a value that changes whenever operators or special variables change."""
+        return (self._configuration_version, self.operators.version)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # the lexer and the cache are rebuilt instead of being pickled. Sinks stay with the original parser.
+        return {"operators": self.operators, "special_variables": sorted(self.special_variables), "cache_size": self.cache_size, "literals": self.literals, "identifiers": self.identifiers}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        if "_operators" in state:
+            # the previous release pickled the __dict__ of parsers.
+            state = {"operators": state["_operators"], "special_variables": state["_special_variables"], "cache_size": 0}
+        self.__init__(state["operators"], special_variables=state["special_variables"], cache_size=state["cache_size"], literals=state.get("literals"), identifiers=state.get("identifiers"))
 
     def __str__(self) -> str:
         return f"{self.operators}"
@@ -55,19 +256,13 @@ class ExpressionParser:
     def is_operand(self, c: str) -> bool:
         return self._is_constant(c) or self._is_variable(c) or c in self.special_variables
 
-    @staticmethod
-    def _is_variable(c: str) -> bool:
-        return c.isalpha() and len(c) == 1
-
-    @staticmethod
-    def _is_constant(c: str) -> bool:
-        if len(c.strip()) != len(c) or c[0] == '+' or c[0] == '-' or c is None:
-            return False
-        try:
-            float(c)
+    def _is_variable(self, c: str) -> bool:
+        if c.isalpha() and len(c) == 1:
             return True
-        except ValueError:
-            return False
+        return self._identifiers is not None and self._identifiers.fullmatch(c) is not None
+
+    def _is_constant(self, c: str) -> bool:
+        return self._literals.is_literal(c)
 
     @staticmethod
     def is_open_bracket(c: str) -> bool:
@@ -91,130 +286,252 @@ class ExpressionParser:
             return True
         return False
 
-    def _is_valid_token(self, token: str) -> bool:
-        return self._is_bracket(token) or self.is_operand(token) or self.operators.is_operator(token) or token.isspace() or token == escape_charcter
-
-    def _find_next_matching_token(self, expression: str, start_idx: int) -> Tuple[str, int]:
-        token = ''
-        accepted_lexeme = ''
-        longest_idx = start_idx
-        while start_idx < len(expression):
-            token += expression[start_idx]
-            if self._is_valid_token(token):
-                accepted_lexeme = token
-                longest_idx = start_idx
-            start_idx += 1
-        return (accepted_lexeme, longest_idx)
+    def _get_lexer(self) -> Lexer:
+        """Return the lexer of the current configuration, it is rebuilt whenever operators or special variables change."""
+        fingerprint = self._fingerprint()
+        # the lexer is stored with its fingerprint in one tuple, so threads never see a mismatched pair.
+        if self._lexer is None or self._lexer[0] != fingerprint:
+            symbols = {"(", ")", "[", "]", "{", "}", escape_charcter}
+            symbols.update(self.operators.get_operators_symbol())
+            symbols.update(self.special_variables)
+            self._lexer = (fingerprint, Lexer(symbols, self.literals, self.identifiers))
+        return self._lexer[1]
 
     def tokenize(self, expression: str) -> List[str]:
         """Split the expression into tokens"""
-        idx = 0
-        tokens = []
-        while idx < len(expression):
-            token, next_idx = self._find_next_matching_token(expression, idx)
-            if not token:
-                raise InvalidExpressionException(
-                    "expression is not valid.")
-            idx = next_idx + 1
-            tokens.append(token)
+        if self._sink is not None:
+            return self._observe("tokenize", expression, lambda recorder: self._tokenize(expression, recorder))
+        return self._get_lexer().tokenize(expression)
+
+    def _tokenize(self, expression: str, recorder: _Recorder) -> List[str]:
+        start = time.perf_counter()
+        tokens = self._get_lexer().tokenize(expression)
+        recorder.tokenize_seconds = time.perf_counter() - start
+        recorder.tokens = len(tokens)
         return tokens
 
-    def _parse(self, tokens: List[str], tokens_postfix: List[str]) -> None:
-        """validates expression tokens and constructs postfix form from given tokens."""
-        if not tokens:
-            raise InvalidExpressionException(
-                "expression is not valid.")
+    def iter_tokenize(self, source: Any, *, chunk_size: int = 65536, encoding: str = "utf-8") -> Iterator[str]:
+        """Split an expression read from a file object or a memory-mapped file into tokens lazily."""
+        return self._get_lexer().iter_tokenize(iter_chunks(source, chunk_size, encoding))
+
+    def _match_brackets(self, tokens: List[str]) -> Dict[int, Tuple[int, str]]:
+        """Return (index, token) of the close bracket of every balanced open bracket, by the open bracket index. Escaped
+        tokens are skipped."""
+        matches = {}
+        deque(self._iter_match_brackets(tokens, matches, max(len(tokens), 1)), maxlen=0)
+        return matches
+
+    def _iter_match_brackets(self, tokens: List[str], matches: Dict[int, Tuple[int, str]], chunk_size: int) -> Iterator[None]:
+        """Fill matches like _match_brackets, yielding after every chunk_size tokens so callers can pause between chunks."""
+        open_brackets = []
         sz = len(tokens)
-        operators_stack = deque()
-        is_previous_character_operand = False
         i = 0
         while i < sz:
-            if self.is_open_bracket(tokens[i]):
-                if is_previous_character_operand:
-                    raise InvalidExpressionException(
-                        "expression is not valid.")
-                open_brackets_count = 0
-                idx = i
-                # find its close bracket.
-                while open_brackets_count != 1 or not self.is_close_bracket(tokens[idx]):
-                    if tokens[idx] == escape_charcter:
-                        idx += 1
-                    elif self.is_open_bracket(tokens[idx]):
-                        open_brackets_count += 1
-                    elif self.is_close_bracket(tokens[idx]):
-                        open_brackets_count -= 1
-                    idx += 1
-                    if idx >= sz:
-                        raise InvalidParenthesesException(
-                            "expression's parenthesis are not balanced.")
-                if not self._are_pairs(tokens[i], tokens[idx]):
-                    raise InvalidParenthesesException(
-                        "expression's parenthesis are not balanced.")
-                self._parse(tokens[i + 1: idx], tokens_postfix)
-
-                i = idx
-                is_previous_character_operand = True
-
-            elif self.is_close_bracket(tokens[i]):
-                raise InvalidParenthesesException(
-                    "expression's parenthesis are not balanced.")
-
-            elif tokens[i].isspace():
+            stop = min(i + chunk_size, sz)
+            while i < stop:
+                if tokens[i] == escape_charcter:
+                    i += 1
+                elif self.is_open_bracket(tokens[i]):
+                    open_brackets.append(i)
+                elif self.is_close_bracket(tokens[i]) and open_brackets:
+                    matches[open_brackets.pop()] = (i, tokens[i])
                 i += 1
+            yield
+
+    def _iter_parse(self, tokens: Iterable[str], matches: Optional[Dict[int, Tuple[int, str]]] = None, operators_stack: Optional[List[int]] = None, state: Optional[List[Any]] = None) -> Iterator[Union[str, Operator]]:
+        """validates expression tokens and yields their postfix form.
+        matches holds (index, token) of the close bracket of every balanced open bracket by the open bracket index. A
+        close bracket that doesn't pair with its open bracket is reported when the open bracket is met. Without it, tokens are
+        consumed lazily and brackets are checked when they are closed.
+        operators_stack is the empty list used as operators stack, instrumentation passes one that records its depth.
+        state resumes a parse split in parts, it is [operators stack, open brackets, is_previous_character_operand] at the
+        end of the previous parts. It is updated in place, the end of the tokens isn't checked as the end of the
+        expression and errors indexes are relative to the part. Parts can't end between an escape and its token."""
+        tokens = iter(tokens)
+        grammar = self.operators.grammar
+        rules, resolutions, pops, leaves_operand, bracket = grammar.rules, grammar.resolutions, grammar.pops, grammar.leaves_operand, grammar.bracket
+        # operators are pushed as rule ids. The bracket marker separates the operators of each brackets level, one is
+        # always at the bottom so the stack is never empty.
+        if state is not None:
+            operators_stack, open_brackets, is_previous_character_operand = state
+            # brackets opened in previous parts have no index in this part.
+            open_brackets_indexes = [None] * len(open_brackets)
+        else:
+            if operators_stack is None:
+                operators_stack = []
+            operators_stack.append(bracket)
+            open_brackets = []
+            open_brackets_indexes = []
+            is_previous_character_operand = False
+        # literals are converted only if the scanner yields numbers.
+        literals = self._literals if self._literals.values is not None else None
+        i = -1
+        for token in tokens:
+            i += 1
+            if self.is_open_bracket(token):
+                if is_previous_character_operand:
+                    raise _invalid_expression(i, token, "operator")
+                if matches is not None:
+                    if i not in matches:
+                        raise _unbalanced_parentheses(i, token, "close bracket", i)
+                    close_idx, close_token = matches[i]
+                    if not self._are_pairs(token, close_token):
+                        # reported at the close bracket, like when brackets are checked lazily.
+                        raise _unbalanced_parentheses(close_idx, close_token, "close bracket", i)
+                operators_stack.append(bracket)
+                open_brackets.append(token)
+                open_brackets_indexes.append(i)
+
+            elif self.is_close_bracket(token):
+                if not open_brackets:
+                    raise _unbalanced_parentheses(i, token, None, i)
+                if matches is None and not self._are_pairs(open_brackets[-1], token):
+                    raise _unbalanced_parentheses(i, token, "close bracket", open_brackets_indexes[-1])
+                if not is_previous_character_operand:
+                    raise _invalid_expression(i, token, "operand")
+                while operators_stack[-1] != bracket:
+                    yield rules[operators_stack.pop()]
+                operators_stack.pop()
+                open_brackets.pop()
+                open_brackets_indexes.pop()
+
+            elif token.isspace():
                 continue
 
-            elif tokens[i] == escape_charcter:
+            elif token == escape_charcter:
                 if is_previous_character_operand:
-                    raise InvalidExpressionException(
-                        "expression is not valid.")
+                    raise _invalid_expression(i, token, "operator")
                 is_previous_character_operand = True
-                tokens_postfix.append(tokens[i])
+                yield token
+                token = next(tokens, None)
                 i += 1
-                tokens_postfix.append(tokens[i])
-
-            elif self.operators.is_operator(tokens[i]):
-                unary_rule = binary_rule = None
-                is_valid = False
-                for rule in self.operators.get_operator_rules(tokens[i]):
-                    if rule.type == Operator.unary:
-                        unary_rule = rule
-                    if rule.type == Operator.binary:
-                        binary_rule = rule
-                if unary_rule:
-                    if (unary_rule.position == Operator.postfix and is_previous_character_operand) or (unary_rule.position == Operator.prefix and not is_previous_character_operand):
-                        is_valid = True
-                        binary_rule = None
-                if binary_rule:
-                    if is_previous_character_operand:
-                        is_valid = True
-                        unary_rule = None
-                    is_previous_character_operand = False
-                if not is_valid:
-                    raise InvalidExpressionException(
-                        "expression is not valid.")
-                while operators_stack and self.operators.does_have_higher_precedence(operators_stack[-1][1], unary_rule if unary_rule else binary_rule):
-                    tokens_postfix.append(operators_stack[-1][1])
-                    operators_stack.pop()
-                operators_stack.append(
-                    (tokens[i], unary_rule if unary_rule else binary_rule))
-
-            elif self.is_operand(tokens[i]):
+                if token is None:
+                    raise _invalid_expression(i, None, "operand")
+                yield token
+
+            elif token in resolutions:
+                rule = resolutions[token][is_previous_character_operand]
+                if rule < 0:
+                    raise _invalid_expression(i, token, "operator" if is_previous_character_operand else "operand")
+                is_previous_character_operand = leaves_operand[rule]
+                while pops[operators_stack[-1]][rule]:
+                    yield rules[operators_stack.pop()]
+                operators_stack.append(rule)
+
+            elif self.is_operand(token):
                 if is_previous_character_operand:
-                    raise InvalidExpressionException(
-                        "expression is not valid.")
+                    raise _invalid_expression(i, token, "operator")
                 is_previous_character_operand = True
-                tokens_postfix.append(tokens[i])
+                yield token if literals is None or not literals.is_literal(token) else literals.convert(token)
 
             else:
-                raise InvalidExpressionException(
-                    "expression is not valid.")
-            i += 1
+                raise _invalid_expression(i, token, "operator" if is_previous_character_operand else "operand")
+        if state is not None:
+            state[2] = is_previous_character_operand
+            return
+        if open_brackets:
+            raise _unbalanced_parentheses(i + 1, None, "close bracket", open_brackets_indexes[-1])
         if not is_previous_character_operand:
-            raise InvalidExpressionException(
-                "expression is not valid.")
-        while operators_stack:
-            tokens_postfix.append(operators_stack[-1][1])
-            operators_stack.pop()
+            raise _invalid_expression(i + 1, None, "operand")
+        while len(operators_stack) > 1:
+            yield rules[operators_stack.pop()]
+
+    def _parse(self, tokens: List[str], tokens_postfix: List[str], operators_stack: Optional[List[int]] = None) -> None:
+        """validates expression tokens and constructs postfix form from given tokens."""
+        matches = self._match_brackets(tokens)
+        try:
+            tokens_postfix.extend(self._iter_parse(tokens, matches, operators_stack=operators_stack))
+        except ExpressionException as error:
+            self._locate(error, lambda index: sum(map(len, itertools.islice(tokens, index))))
+            raise
+
+    @staticmethod
+    def _locate(error: ExpressionException, offset_of: Callable[[int], Optional[int]]) -> None:
+        """Set the offsets of a parse error from its tokens indexes. offset_of(index) returns the offset of a token,
+        the expression length for the index after the last token."""
+        if error._index is not None and error.offset is None:
+            error.offset = offset_of(error._index)
+        if error._bracket_index is not None and error.bracket_offset is None:
+            error.bracket_offset = offset_of(error._bracket_index)
+
+    def validate(self, expression: str) -> List[ExpressionException]:
+        """Return every error of the expression, in one pass. The expression is valid for postfix() if there is none.
+
+        Parsing goes on after every error as if it was fixed: unknown characters are skipped, missing operators or
+        operands are assumed, unmatched close brackets are dropped and brackets left open are reported at the end.
+        Errors have the same types and attributes as the ones raised by postfix().
+        """
+        if not isinstance(expression, str):
+            raise TypeError(
+                f"expression has to be str. {expression} is {type(expression)}, not str.")
+        errors = []
+        resolutions = self.operators.grammar.resolutions
+        leaves_operand = self.operators.grammar.leaves_operand
+        open_brackets = []
+        is_previous_character_operand = False
+        is_escaped = False
+        for start, end, is_valid in self._get_lexer().scan(expression):
+            token = expression[start: end]
+            if not is_valid:
+                errors.append(InvalidExpressionException(
+                    "expression is not valid.", offset=start, token=token, expected="token"))
+                is_escaped = False
+            elif is_escaped:
+                is_escaped = False
+            elif token.isspace():
+                continue
+            elif self.is_open_bracket(token):
+                if is_previous_character_operand:
+                    errors.append(InvalidExpressionException(
+                        "expression is not valid.", offset=start, token=token, expected="operator"))
+                open_brackets.append((token, start))
+                is_previous_character_operand = False
+            elif self.is_close_bracket(token):
+                if not open_brackets:
+                    errors.append(InvalidParenthesesException(
+                        "expression's parenthesis are not balanced.", offset=start, token=token, bracket_offset=start))
+                    continue
+                bracket, bracket_start = open_brackets.pop()
+                if not self._are_pairs(bracket, token):
+                    errors.append(InvalidParenthesesException(
+                        "expression's parenthesis are not balanced.", offset=start, token=token, expected="close bracket", bracket_offset=bracket_start))
+                if not is_previous_character_operand:
+                    errors.append(InvalidExpressionException(
+                        "expression is not valid.", offset=start, token=token, expected="operand"))
+                is_previous_character_operand = True
+            elif token == escape_charcter:
+                if is_previous_character_operand:
+                    errors.append(InvalidExpressionException(
+                        "expression is not valid.", offset=start, token=token, expected="operator"))
+                is_previous_character_operand = True
+                is_escaped = True
+            elif token in resolutions:
+                resolution = resolutions[token]
+                rule = resolution[is_previous_character_operand]
+                if rule < 0:
+                    errors.append(InvalidExpressionException(
+                        "expression is not valid.", offset=start, token=token, expected="operator" if is_previous_character_operand else "operand"))
+                    # the symbol is taken with its other rule.
+                    rule = resolution[not is_previous_character_operand]
+                is_previous_character_operand = leaves_operand[rule] if rule >= 0 else is_previous_character_operand
+            else:
+                if is_previous_character_operand:
+                    errors.append(InvalidExpressionException(
+                        "expression is not valid.", offset=start, token=token, expected="operator"))
+                elif not self.is_operand(token):
+                    errors.append(InvalidExpressionException(
+                        "expression is not valid.", offset=start, token=token, expected="operand"))
+                is_previous_character_operand = True
+        if is_escaped:
+            errors.append(InvalidExpressionException(
+                "expression is not valid.", offset=len(expression), expected="operand"))
+        elif not is_previous_character_operand:
+            errors.append(InvalidExpressionException(
+                "expression is not valid.", offset=len(expression), expected="operand"))
+        for bracket, bracket_start in reversed(open_brackets):
+            errors.append(InvalidParenthesesException(
+                "expression's parenthesis are not balanced.", offset=bracket_start, token=bracket, expected="close bracket", bracket_offset=bracket_start))
+        return errors
 
     def postfix(self, expression: str, include_operators_rules: bool = False) -> List[str]:
         """Return the postfix form for the expression."""
@@ -222,39 +539,176 @@ class ExpressionParser:
             raise TypeError(
                 f"expression has to be str. {expression} is {type(expression)}, not str.")
 
-        tokens = self.tokenize(expression)
-        postfix = []
-        self._parse(tokens, postfix)
+        if self._sink is not None:
+            postfix = self._observe("postfix", expression, lambda recorder: self._postfix(expression, recorder))
+        else:
+            postfix = self._postfix(expression)
         if not include_operators_rules:
-            postfix = [c.symbol if isinstance(c, Operator) else c for c in postfix]
+            return [c.symbol if isinstance(c, Operator) else c for c in postfix]
+        return list(postfix)
+
+    def _postfix(self, expression: str, recorder: Optional[_Recorder] = None, tokens: Optional[List[str]] = None) -> Tuple[Union[str, Operator], ...]:
+        """Return the postfix form with operators rules, from the cache if it is enabled. The recorder, if any, gets
+        the phases metrics. tokens are the expression tokens if they are known already."""
+        cache = self._cache
+        if cache is not None:
+            fingerprint = self._fingerprint()
+            postfix = cache.get(expression, fingerprint)
+            if postfix is not None:
+                if recorder is not None:
+                    recorder.cached = True
+                return postfix
+        postfix = []
+        if recorder is None:
+            self._parse(tokens if tokens is not None else self._get_lexer().tokenize(expression), postfix)
+        else:
+            if tokens is None:
+                tokens = self._tokenize(expression, recorder)
+            start = time.perf_counter()
+            self._parse(tokens, postfix, recorder.make_stack(self.operators.grammar.bracket))
+            recorder.parse_seconds = time.perf_counter() - start
+        postfix = tuple(postfix)
+        if cache is not None:
+            cache.put(expression, fingerprint, postfix)
         return postfix
 
-    def syntax_tree(self, expression: str) -> Node:
-        """Return the expression syntax tree."""
-        postfix = self.postfix(expression, include_operators_rules=True)
-        stack = deque()
-        i = 0
-        while i < len(postfix):
-            node = Node(postfix[i])
-            if isinstance(postfix[i], Operator):
-                node = Node(postfix[i].symbol)
-                if postfix[i].type == Operator.unary:
-                    if postfix[i].position == Operator.postfix:
-                        if len(stack) < 1:
-                            raise InvalidExpressionException(
-                                "expression is not valid.")
-                        node.left = stack.pop()
-                    if postfix[i].position == Operator.prefix:
-                        if len(stack) < 1:
-                            raise InvalidExpressionException(
-                                "expression is not valid.")
-                        node.right = stack.pop()
-                if postfix[i].type == Operator.binary:
-                    if len(stack) < 2:
+    def parse(self, expression: str, include_operators_rules: bool = False, *, syntax_tree: bool = False) -> ParseResult:
+        """Return the postfix form of the expression with the index of the variables it references, and its syntax tree
+        if asked for. The index is built from the tokens of the one lexing pass, without walking the tree. Escaped
+        characters and special variables are variables too. The postfix form comes from the cache if it is enabled, the
+        expression is still lexed for the offsets."""
+        if not isinstance(expression, str):
+            raise TypeError(
+                f"expression has to be str. {expression} is {type(expression)}, not str.")
+        if self._sink is not None:
+            return self._observe("parse", expression, lambda recorder: self._parse_result(expression, include_operators_rules, syntax_tree, recorder))
+        return self._parse_result(expression, include_operators_rules, syntax_tree)
+
+    def _parse_result(self, expression: str, include_operators_rules: bool, syntax_tree: bool, recorder: Optional[_Recorder] = None) -> ParseResult:
+        tokens = self._get_lexer().tokenize(expression) if recorder is None else self._tokenize(expression, recorder)
+        postfix = self._postfix(expression, recorder, tokens)
+        resolutions = self.operators.grammar.resolutions
+        variables: Dict[str, List[int]] = {}
+        offset = 0
+        is_escaped = False
+        for token in tokens:
+            # the expression is valid, so every token that isn't a bracket, a space, an operator or a constant is a variable.
+            if is_escaped or not (token in resolutions or token == escape_charcter or self._is_bracket(token) or token.isspace() or self._is_constant(token)):
+                variables.setdefault(token, []).append(offset)
+                is_escaped = False
+            elif token == escape_charcter:
+                is_escaped = True
+            offset += len(token)
+        root = None
+        if syntax_tree:
+            start = time.perf_counter()
+            root = self._build_tree(postfix, Node._make)
+            if recorder is not None:
+                recorder.tree_seconds = time.perf_counter() - start
+        if not include_operators_rules:
+            return ParseResult([c.symbol if isinstance(c, Operator) else c for c in postfix], root, variables)
+        return ParseResult(list(postfix), root, variables)
+
+    def iter_postfix(self, source: Any, include_operators_rules: bool = False, *, chunk_size: int = 65536, encoding: str = "utf-8") -> Iterator[Union[str, Operator]]:
+        """Yield the postfix form of an expression read from a file object or a memory-mapped file.
+        Memory is bounded by the operators stack and brackets nesting, not the expression size. Brackets are checked when
+        they are closed, so an invalid expression may be reported after some of its postfix form is yielded, and an
+        expression with many errors may report a different one than postfix()."""
+        offsets = _StreamOffsets(self)
+        try:
+            for c in self._iter_parse(offsets.track(self.iter_tokenize(source, chunk_size=chunk_size, encoding=encoding))):
+                yield c.symbol if not include_operators_rules and isinstance(c, Operator) else c
+        except ExpressionException as error:
+            self._locate(error, offsets.offset_of)
+            raise
+
+    @staticmethod
+    def _push_node(stack: deque, token: Union[str, Operator], make_node: Callable[[Any, Any, Any], Any]) -> None:
+        """Push the node of a postfix token to the stack, its children are popped from the stack."""
+        left = right = None
+        value = token
+        if isinstance(token, Operator):
+            value = token.symbol
+            if token.type == Operator.unary:
+                if token.position == Operator.postfix:
+                    if len(stack) < 1:
                         raise InvalidExpressionException(
                             "expression is not valid.")
-                    node.right = stack.pop()
-                    node.left = stack.pop()
-            stack.append(node)
-            i += 1
+                    left = stack.pop()
+                if token.position == Operator.prefix:
+                    if len(stack) < 1:
+                        raise InvalidExpressionException(
+                            "expression is not valid.")
+                    right = stack.pop()
+            if token.type == Operator.binary:
+                if len(stack) < 2:
+                    raise InvalidExpressionException(
+                        "expression is not valid.")
+                right = stack.pop()
+                left = stack.pop()
+        stack.append(make_node(value, left, right))
+
+    def _build_syntax_tree(self, expression: str, make_node: Callable[[Any, Any, Any], Any], operation: str = "syntax_tree") -> Any:
+        """Build the expression syntax tree bottom up. make_node(value, left, right) creates a node from its children.
+        operation names the call in the metrics."""
+        if not isinstance(expression, str):
+            raise TypeError(
+                f"expression has to be str. {expression} is {type(expression)}, not str.")
+        if self._sink is not None:
+            return self._observe(operation, expression, lambda recorder: self._build_observed_tree(expression, make_node, recorder))
+        return self._build_tree(self._postfix(expression), make_node)
+
+    def _build_tree(self, postfix: Tuple[Union[str, Operator], ...], make_node: Callable[[Any, Any, Any], Any]) -> Any:
+        stack = deque()
+        for token in postfix:
+            self._push_node(stack, token, make_node)
         return stack.pop()
+
+    def _build_observed_tree(self, expression: str, make_node: Callable[[Any, Any, Any], Any], recorder: _Recorder) -> Any:
+        postfix = self._postfix(expression, recorder)
+        start = time.perf_counter()
+        root = self._build_tree(postfix, make_node)
+        recorder.tree_seconds = time.perf_counter() - start
+        return root
+
+    def syntax_tree(self, expression: str) -> Node:
+        """Return the expression syntax tree."""
+        return self._build_syntax_tree(expression, Node._make)
+
+    def flat_syntax_tree(self, expression: str) -> FlatTree:
+        """Return the expression syntax tree stored as flat arrays."""
+        tree = FlatTree()
+        self._build_syntax_tree(expression, tree.add, "flat_syntax_tree")
+        return tree
+
+    def dag_syntax_tree(self, expression: str, table: Optional[NodeTable] = None) -> DagNode:
+        """Return the expression syntax tree as a DAG whose structurally identical subtrees are one shared immutable node.
+        Passing the same table for many expressions shares their common subexpressions too."""
+        if table is None:
+            table = NodeTable()
+        return self._build_syntax_tree(expression, table.make, "dag_syntax_tree")
+
+    def parse_many(self, expressions: Iterable[str], method: str = "postfix", *, workers: Optional[int] = None, chunk_size: int = 1000, ordered: bool = True, **kwargs: Any) -> Iterator[BatchResult]:
+        """Parse many expressions, optionally across worker processes, and yield a BatchResult for each of them.
+        Errors are reported in the results instead of stopping the batch."""
+        return parse_many(self, expressions, method, workers=workers, chunk_size=chunk_size, ordered=ordered, **kwargs)
+
+    def postfix_many(self, expressions: Iterable[str], include_operators_rules: bool = False, *, workers: Optional[int] = None, chunk_size: int = 1000, ordered: bool = True) -> Iterator[BatchResult]:
+        """Return the postfix forms of many expressions. See parse_many."""
+        return self.parse_many(expressions, "postfix", workers=workers, chunk_size=chunk_size, ordered=ordered, include_operators_rules=include_operators_rules)
+
+    def syntax_tree_many(self, expressions: Iterable[str], *, workers: Optional[int] = None, chunk_size: int = 1000, ordered: bool = True) -> Iterator[BatchResult]:
+        """Return the syntax trees of many expressions. See parse_many."""
+        return self.parse_many(expressions, "syntax_tree", workers=workers, chunk_size=chunk_size, ordered=ordered)
+
+    async def apostfix(self, expression: str, include_operators_rules: bool = False) -> List[Union[str, Operator]]:
+        """Return the postfix form for the expression without blocking the event loop. See AsyncParser."""
+        return await self.async_parser.postfix(expression, include_operators_rules)
+
+    async def asyntax_tree(self, expression: str) -> Node:
+        """Return the expression syntax tree without blocking the event loop. See AsyncParser."""
+        return await self.async_parser.syntax_tree(expression)
+
+    def session(self, text: str = "") -> ParseSession:
+        """Return a parsing session for an expression that is edited many times."""
+        return ParseSession(self, text)
@@ -0,0 +1,411 @@
+"""Compact binary encoding of postfix forms and syntax trees.
+
+Every record starts with the magic bytes, the format version and its kind. A postfix record holds the table of its
+operators rules, the table of its distinct operands and the postfix tokens as varints indexing both tables. A tree record
+holds the table of its distinct values and the nodes in postorder, each one as a varint of its value index and which
+children it has. Operands and values are typed: str, or the int, float and Decimal numbers parsers configured with
+literal values yield. Bulk files hold a header followed by length prefixed records.
+
+Decoding reads straight from bytes, bytearray, memoryview or mmap objects without copying them.
+"""
+
+import mmap
+import struct
+from decimal import Decimal, InvalidOperation
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from AlgebraicExpressionParser.parser.node import Node
+from AlgebraicExpressionParser.parser.operators import Operator, Operators
+
+
+MAGIC = b"AEP"
+FORMAT_VERSION = 2
+# version 1 operands and values are untyped str.
+_read_versions = (1, 2)
+
+_POSTFIX = 0
+_TREE = 1
+_BULK = 2
+
+_STR = 0
+_INT = 1
+_FLOAT = 2
+_DECIMAL = 3
+
+_float = struct.Struct("<d")
+
+_associativities = (Operator.ltr, Operator.rtl)
+_positions = (Operator.prefix, Operator.infix, Operator.postfix)
+
+Buffer = Union[bytes, bytearray, memoryview, mmap.mmap]
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: memoryview, idx: int) -> Tuple[int, int]:
+    """Return the varint at idx and the index after it."""
+    value = 0
+    shift = 0
+    try:
+        while True:
+            byte = data[idx]
+            idx += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value, idx
+            shift += 7
+    except IndexError:
+        raise ValueError(
+            "data is truncated.") from None
+
+
+def _write_string(out: bytearray, string: str) -> None:
+    encoded = string.encode("utf-8")
+    _write_varint(out, len(encoded))
+    out += encoded
+
+
+def _read_string(data: memoryview, idx: int) -> Tuple[str, int]:
+    size, idx = _read_varint(data, idx)
+    if idx + size > len(data):
+        raise ValueError(
+            "data is truncated.")
+    return str(data[idx: idx + size], "utf-8"), idx + size
+
+
+def _operand_key(operand: Any) -> Tuple[type, Any]:
+    """Return the key operands are interned by. Equal numbers of different types or representations, like 1 and 1.0,
+    0.0 and -0.0 or Decimal('1.0') and Decimal('1.00'), are different operands."""
+    if isinstance(operand, str):
+        return str(operand)
+    operand_type = type(operand)
+    if operand_type is int:
+        return (int, operand)
+    if operand_type is float:
+        return (float, _float.pack(operand))
+    if operand_type is Decimal:
+        return (Decimal, str(operand))
+    raise TypeError(
+        f"operands and tree values have to be str, int, float or decimal.Decimal. {operand} is {type(operand)}.")
+
+
+def _write_operand(out: bytearray, operand: Any) -> None:
+    operand_type = type(operand)
+    if isinstance(operand, str):
+        out.append(_STR)
+        _write_string(out, operand)
+    elif operand_type is int:
+        out.append(_INT)
+        # zigzag encoded, like precedences.
+        _write_varint(out, operand << 1 if operand >= 0 else (-operand << 1) - 1)
+    elif operand_type is float:
+        out.append(_FLOAT)
+        out += _float.pack(operand)
+    else:
+        out.append(_DECIMAL)
+        _write_string(out, str(operand))
+
+
+def _read_operand(data: memoryview, idx: int, version: int) -> Tuple[Any, int]:
+    if version == 1:
+        return _read_string(data, idx)
+    if idx >= len(data):
+        raise ValueError(
+            "data is truncated.")
+    operand_type = data[idx]
+    idx += 1
+    if operand_type == _STR:
+        return _read_string(data, idx)
+    if operand_type == _INT:
+        value, idx = _read_varint(data, idx)
+        return value >> 1 if not value & 1 else -((value + 1) >> 1), idx
+    if operand_type == _FLOAT:
+        if idx + _float.size > len(data):
+            raise ValueError(
+                "data is truncated.")
+        return _float.unpack_from(data, idx)[0], idx + _float.size
+    if operand_type == _DECIMAL:
+        value, idx = _read_string(data, idx)
+        try:
+            return Decimal(value), idx
+        except InvalidOperation:
+            raise ValueError(
+                "data is corrupted.") from None
+    raise ValueError(
+        "data is corrupted.")
+
+
+def _write_header(out: bytearray, kind: int) -> None:
+    out += MAGIC
+    out.append(FORMAT_VERSION)
+    out.append(kind)
+
+
+def _read_header(data: memoryview, idx: int) -> Tuple[int, int, int]:
+    """Check the header at idx and return the record kind, its format version and the index after the header."""
+    if bytes(data[idx: idx + len(MAGIC)]) != MAGIC:
+        raise ValueError(
+            "data is not an encoded expression.")
+    idx += len(MAGIC)
+    if idx + 2 > len(data):
+        raise ValueError(
+            "data is truncated.")
+    if data[idx] not in _read_versions:
+        raise ValueError(
+            f"unsupported format version {data[idx]}, versions {', '.join(map(str, _read_versions))} are supported.")
+    return data[idx + 1], data[idx], idx + 2
+
+
+def _rule_key(operator: Operator) -> Tuple[str, int, int, str, str]:
+    return (operator.symbol, operator.type, operator.precedence, operator.associativity, operator.position)
+
+
+def dump_postfix(postfix: Iterable[Union[str, Operator]]) -> bytes:
+    """Encode a postfix form that includes operators rules, like the one returned by postfix(expression, include_operators_rules=True)."""
+    out = bytearray()
+    _write_header(out, _POSTFIX)
+    _write_postfix(out, postfix)
+    return bytes(out)
+
+
+def _write_postfix(out: bytearray, postfix: Iterable[Union[str, Operator]]) -> None:
+    rules: Dict[Tuple[str, int, int, str, str], int] = {}
+    # operands by themselves if they are str, by their key otherwise.
+    operands: Dict[Any, int] = {}
+    operand_values = []
+    # rules and operands are told apart by their codes parity.
+    codes = []
+    for token in postfix:
+        if isinstance(token, Operator):
+            codes.append(rules.setdefault(_rule_key(token), len(rules)) << 1)
+            continue
+        key = token if type(token) is str else _operand_key(token)
+        code = operands.get(key)
+        if code is None:
+            code = operands[key] = len(operand_values)
+            operand_values.append(token)
+        codes.append(code << 1 | 1)
+    _write_varint(out, len(rules))
+    for symbol, rule_type, precedence, associativity, position in rules:
+        _write_string(out, symbol)
+        out.append(rule_type)
+        # precedences are zigzag encoded, so negative ones stay small.
+        _write_varint(out, precedence << 1 if precedence >= 0 else (-precedence << 1) - 1)
+        out.append(_associativities.index(associativity))
+        out.append(_positions.index(position))
+    _write_varint(out, len(operand_values))
+    for operand in operand_values:
+        _write_operand(out, operand)
+    _write_varint(out, len(codes))
+    for code in codes:
+        _write_varint(out, code)
+
+
+def load_postfix(data: Buffer, operators: Optional[Operators] = None) -> List[Union[str, Operator]]:
+    """Decode an encoded postfix form.
+
+    data: represents the encoded postfix form.
+        type: bytes, bytearray, memoryview or mmap
+    operators: represents operators whose Operator instances are used for matching rules, instead of new ones.
+        type: Operators
+        default: None
+    """
+    postfix, _ = _read_record(memoryview(data), 0, _POSTFIX, operators)
+    return postfix
+
+
+def _read_postfix(data: memoryview, idx: int, version: int, operators: Optional[Operators]) -> Tuple[List[Union[str, Operator]], int]:
+    known = {_rule_key(operator): operator for operator in operators.operators} if operators is not None else {}
+    count, idx = _read_varint(data, idx)
+    rules = []
+    for _ in range(count):
+        symbol, idx = _read_string(data, idx)
+        if idx + 1 >= len(data):
+            raise ValueError(
+                "data is truncated.")
+        rule_type = data[idx]
+        if rule_type != Operator.unary and rule_type != Operator.binary:
+            raise ValueError(
+                "data is corrupted.")
+        precedence, idx = _read_varint(data, idx + 1)
+        precedence = precedence >> 1 if not precedence & 1 else -((precedence + 1) >> 1)
+        if idx + 1 >= len(data):
+            raise ValueError(
+                "data is truncated.")
+        key = (symbol, rule_type, precedence, _associativities[data[idx]], _positions[data[idx + 1]])
+        idx += 2
+        operator = known.get(key)
+        if operator is None:
+            operator = Operator(symbol=symbol, type=rule_type, precedence=precedence, associativity=key[3], position=key[4])
+        rules.append(operator)
+    count, idx = _read_varint(data, idx)
+    operands = []
+    for _ in range(count):
+        operand, idx = _read_operand(data, idx, version)
+        operands.append(operand)
+    count, idx = _read_varint(data, idx)
+    postfix = []
+    for _ in range(count):
+        # most codes fit in one byte, they are read without a call.
+        code = data[idx]
+        idx += 1
+        if code >= 0x80:
+            code, idx = _read_varint(data, idx - 1)
+        postfix.append(operands[code >> 1] if code & 1 else rules[code >> 1])
+    return postfix, idx
+
+
+def dump_tree(root: Node) -> bytes:
+    """Encode a syntax tree whose values are str, int, float or Decimal, like the ones returned by syntax_tree()."""
+    out = bytearray()
+    _write_header(out, _TREE)
+    _write_tree(out, root)
+    return bytes(out)
+
+
+def _write_tree(out: bytearray, root: Node) -> None:
+    if not isinstance(root, Node):
+        raise TypeError(
+            f"root has to be a Node instance. {root} is {type(root)}.")
+    # values by themselves if they are str, by their key otherwise.
+    values: Dict[Any, int] = {}
+    value_list = []
+    # the two low bits of every code tell whether the node has a left and a right child.
+    codes = []
+    for node in root.iter_postorder(nodes=True):
+        value = node.value
+        key = value if type(value) is str else _operand_key(value)
+        code = values.get(key)
+        if code is None:
+            code = values[key] = len(value_list)
+            value_list.append(value)
+        codes.append(code << 2 | (node._left is not None) | (node._right is not None) << 1)
+    _write_varint(out, len(value_list))
+    for value in value_list:
+        _write_operand(out, value)
+    _write_varint(out, len(codes))
+    for code in codes:
+        _write_varint(out, code)
+
+
+def load_tree(data: Buffer) -> Node:
+    """Decode an encoded syntax tree.
+
+    data: represents the encoded tree.
+        type: bytes, bytearray, memoryview or mmap
+    """
+    root, _ = _read_record(memoryview(data), 0, _TREE, None)
+    return root
+
+
+def _read_tree(data: memoryview, idx: int, version: int) -> Tuple[Node, int]:
+    count, idx = _read_varint(data, idx)
+    values = []
+    for _ in range(count):
+        value, idx = _read_operand(data, idx, version)
+        values.append(value)
+    count, idx = _read_varint(data, idx)
+    stack = []
+    make = Node._make
+    for _ in range(count):
+        code = data[idx]
+        idx += 1
+        if code >= 0x80:
+            code, idx = _read_varint(data, idx - 1)
+        right = stack.pop() if code & 2 else None
+        left = stack.pop() if code & 1 else None
+        stack.append(make(values[code >> 2], left, right))
+    if len(stack) != 1:
+        raise ValueError(
+            "data is corrupted.")
+    return stack[0], idx
+
+
+def _read_record(data: memoryview, idx: int, expected_kind: Optional[int], operators: Optional[Operators]) -> Tuple[Any, int]:
+    kind, version, idx = _read_header(data, idx)
+    if expected_kind is not None and kind != expected_kind:
+        raise ValueError(
+            f"data holds a {_kind_name(kind)} record, not a {_kind_name(expected_kind)} one.")
+    try:
+        if kind == _POSTFIX:
+            return _read_postfix(data, idx, version, operators)
+        if kind == _TREE:
+            return _read_tree(data, idx, version)
+    except IndexError:
+        raise ValueError(
+            "data is corrupted.") from None
+    raise ValueError(
+        f"data holds a {_kind_name(kind)} record, not a postfix or a tree one.")
+
+
+def _kind_name(kind: int) -> str:
+    return {_POSTFIX: "postfix", _TREE: "tree", _BULK: "bulk"}.get(kind, f"unknown ({kind})")
+
+
+def dump_many(items: Iterable[Union[List[Union[str, Operator]], Node]], file: BinaryIO) -> int:
+    """Write many postfix forms and syntax trees into one binary file object and return the number of written items.
+    Items are encoded one by one, so they can be generated lazily."""
+    header = bytearray()
+    _write_header(header, _BULK)
+    file.write(header)
+    count = 0
+    for item in items:
+        out = bytearray()
+        if isinstance(item, Node):
+            _write_header(out, _TREE)
+            _write_tree(out, item)
+        else:
+            _write_header(out, _POSTFIX)
+            _write_postfix(out, item)
+        prefix = bytearray()
+        _write_varint(prefix, len(out))
+        file.write(prefix)
+        file.write(out)
+        count += 1
+    return count
+
+
+def load_many(data: Buffer, operators: Optional[Operators] = None) -> Iterator[Union[List[Union[str, Operator]], Node]]:
+    """Yield the postfix forms and syntax trees written by dump_many, decoding them lazily from the buffer.
+
+    data: represents the bulk data, usually an mmap of the file.
+        type: bytes, bytearray, memoryview or mmap
+    operators: represents operators whose Operator instances are used for matching rules, instead of new ones.
+        type: Operators
+        default: None
+    """
+    data = memoryview(data)
+    kind, _, idx = _read_header(data, 0)
+    if kind != _BULK:
+        raise ValueError(
+            f"data holds a {_kind_name(kind)} record, not a bulk one.")
+    while idx < len(data):
+        size, idx = _read_varint(data, idx)
+        if idx + size > len(data):
+            raise ValueError(
+                "data is truncated.")
+        item, end = _read_record(data[idx: idx + size], 0, None, operators)
+        if end != size:
+            raise ValueError(
+                "data is corrupted.")
+        idx += size
+        yield item
+
+
+def load_file(path: str, operators: Optional[Operators] = None) -> Iterator[Union[List[Union[str, Operator]], Node]]:
+    """Yield the items of a file written by dump_many. The file is memory-mapped, not read."""
+    with open(path, "rb") as file:
+        if file.seek(0, 2) == 0:
+            raise ValueError(
+                "data is not an encoded expression.")
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            data = memoryview(mapped)
+            try:
+                yield from load_many(data, operators)
+            finally:
+                data.release()
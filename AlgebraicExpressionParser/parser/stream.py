@@ -0,0 +1,36 @@
+import codecs
+from typing import Any, Iterator
+
+
+def iter_chunks(source: Any, chunk_size: int = 65536, encoding: str = "utf-8") -> Iterator[str]:
+    """Yield the text of source chunk by chunk.
+
+    source: represents a text file object, a binary file object or a memory-mapped file. Bytes are decoded incrementally.
+        type: any object with a read(size) method, or str
+    chunk_size: represents the number of characters (or bytes) read at once.
+        type: int
+        default: 65536
+    encoding: represents the encoding of binary sources.
+        type: str
+        default: utf-8
+    """
+    if isinstance(source, str):
+        yield source
+        return
+    if not isinstance(chunk_size, int) or chunk_size < 1:
+        raise TypeError(
+            f"chunk_size has to be a positive int. {chunk_size} is {type(chunk_size)}.")
+    decoder = None
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        if not isinstance(chunk, str):
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder(encoding)()
+            chunk = decoder.decode(chunk)
+        yield chunk
+    if decoder is not None:
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
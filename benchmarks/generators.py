@@ -0,0 +1,82 @@
+"""Synthetic expressions generators. Every generator is deterministic for a given size and seed."""
+
+import random
+from typing import Callable, Dict, List, Tuple
+
+from AlgebraicExpressionParser import ExpressionParser, Operator, Operators
+
+
+def default_operators() -> List[Operator]:
+    return [Operator(symbol='+'), Operator(symbol='-'), Operator(symbol='*', precedence=2), Operator(symbol='/', precedence=2),
+            Operator(symbol='-', type=Operator.unary, precedence=3, associativity=Operator.rtl, position=Operator.prefix),
+            Operator(symbol='^', precedence=4, associativity=Operator.rtl),
+            Operator(symbol='sin', type=Operator.unary, precedence=3, associativity=Operator.rtl, position=Operator.prefix)]
+
+
+def default_parser() -> ExpressionParser:
+    return ExpressionParser(Operators(default_operators()))
+
+
+def flat_chain(size: int, seed: int = 0) -> Tuple[ExpressionParser, str]:
+    """Long chain of binary operators over single letter variables and small constants, like a+2*b-c..."""
+    rng = random.Random(seed)
+    operands = [rng.choice("abcxyz") if rng.random() < 0.5 else str(rng.randint(0, 99)) for _ in range(size)]
+    operators = [rng.choice("+-*/^") for _ in range(size - 1)]
+    return default_parser(), "".join(operand + operator for operand, operator in zip(operands, operators)) + operands[-1]
+
+
+def deep_nesting(size: int, seed: int = 0) -> Tuple[ExpressionParser, str]:
+    """Brackets nested size levels deep, like (a+(b*(c-...)))."""
+    rng = random.Random(seed)
+    brackets = [rng.choice("([{") for _ in range(size)]
+    closes = {"(": ")", "[": "]", "{": "}"}
+    head = "".join(f"{rng.choice('abcxyz')}{rng.choice('+-*')}{bracket}" for bracket in brackets)
+    return default_parser(), head + "x" + "".join(closes[bracket] for bracket in reversed(brackets))
+
+
+def custom_operators(size: int, seed: int = 0, count: int = 200) -> Tuple[ExpressionParser, str]:
+    """Chain of size operators picked from count custom multi character operators, half of them with a unary rule too."""
+    rng = random.Random(seed)
+    symbols = [f"op{i}" for i in range(count)]
+    operators = [Operator(symbol=symbol, precedence=rng.randint(1, 10), associativity=rng.choice([Operator.ltr, Operator.rtl])) for symbol in symbols]
+    operators += [Operator(symbol=symbol, type=Operator.unary, precedence=11, associativity=Operator.rtl, position=Operator.prefix) for symbol in symbols[::2]]
+    parser = ExpressionParser(Operators(operators))
+    parts = [rng.choice("abcxyz")]
+    for _ in range(size - 1):
+        parts.append(rng.choice(symbols))
+        if rng.random() < 0.2:
+            parts.append(rng.choice(symbols[::2]))
+        parts.append(rng.choice("abcxyz"))
+    return parser, "".join(parts)
+
+
+def special_variables(size: int, seed: int = 0, count: int = 500) -> Tuple[ExpressionParser, str]:
+    """Chain of size operands picked from count multi character special variables."""
+    rng = random.Random(seed)
+    names = [f"var_{i}" for i in range(count)]
+    parser = ExpressionParser(Operators(default_operators()), special_variables=set(names))
+    return parser, "+".join(rng.choice(names) for _ in range(size))
+
+
+def long_literals(size: int, seed: int = 0, digits: int = 40) -> Tuple[ExpressionParser, str]:
+    """Chain of size numeric literals of about digits digits, with fractions, exponents and digits separators."""
+    rng = random.Random(seed)
+    literals = []
+    for _ in range(size):
+        literal = "".join(rng.choice("0123456789") for _ in range(digits))
+        literal = f"{literal[:digits // 2]}.{literal[digits // 2:]}"
+        if rng.random() < 0.5:
+            literal += f"e{rng.choice('+-')}{rng.randint(0, 300)}"
+        if rng.random() < 0.3:
+            literal = literal[:3] + "_" + literal[3:]
+        literals.append(literal)
+    return default_parser(), "*".join(literals)
+
+
+GENERATORS: Dict[str, Callable[..., Tuple[ExpressionParser, str]]] = {
+    "flat_chain": flat_chain,
+    "deep_nesting": deep_nesting,
+    "custom_operators": custom_operators,
+    "special_variables": special_variables,
+    "long_literals": long_literals,
+}
@@ -0,0 +1,166 @@
+"""Benchmark the parser hot paths over synthetic expressions and compare them with a stored baseline.
+
+Usage:
+    python -m benchmarks.run                                  # run and print the results
+    python -m benchmarks.run --save baseline.json             # store the results as the baseline
+    python -m benchmarks.run --baseline baseline.json --threshold 0.2
+
+Timings depend on the machine, so no baseline is shipped: save one on the machine the comparisons run on. Comparing with
+a baseline exits with status 1 if any timing or peak memory grew more than the thresholds allow.
+"""
+
+import argparse
+import gc
+import json
+import math
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.generators import GENERATORS
+
+
+def _operations(parser: Any, expression: str) -> Dict[str, Callable[[], Any]]:
+    """Return the benchmarked operations of one expression. Traversals run over a tree built beforehand."""
+    tree = parser.syntax_tree(expression)
+    return {
+        "tokenize": lambda: parser.tokenize(expression),
+        "postfix": lambda: parser.postfix(expression),
+        "syntax_tree": lambda: parser.syntax_tree(expression),
+        "preorder": tree.preorder,
+        "inorder": tree.inorder,
+        "postorder": tree.postorder,
+    }
+
+
+def _time(operation: Callable[[], Any], repeat: int) -> float:
+    """Return the best time of repeat runs, in seconds. A first untimed run builds the parser lexer and grammar."""
+    operation()
+    best = math.inf
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        operation()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _peak_memory(operation: Callable[[], Any]) -> int:
+    """Return the peak memory allocated by one run, in bytes. It is measured apart since tracing slows the run down."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        operation()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(scenarios: List[str], sizes: List[int], repeat: int) -> Dict[str, Dict[str, Any]]:
+    """Run every operation of every scenario and size. Results are keyed by scenario/operation/size."""
+    results = {}
+    for scenario in scenarios:
+        for size in sizes:
+            parser, expression = GENERATORS[scenario](size)
+            for name, operation in _operations(parser, expression).items():
+                results[f"{scenario}/{name}/{size}"] = {
+                    "scenario": scenario,
+                    "operation": name,
+                    "size": size,
+                    "characters": len(expression),
+                    "seconds": _time(operation, repeat),
+                    "peak_memory": _peak_memory(operation),
+                }
+    return results
+
+
+def scaling(results: Dict[str, Dict[str, Any]]) -> Dict[Tuple[str, str], List[Tuple[int, float]]]:
+    """Return the empirical complexity exponent between consecutive sizes of every scenario operation.
+    1 means linear scaling, 2 quadratic."""
+    curves = {}
+    for result in results.values():
+        curves.setdefault((result["scenario"], result["operation"]), []).append((result["size"], result["seconds"]))
+    exponents = {}
+    for key, points in curves.items():
+        points.sort()
+        exponents[key] = [(size2, math.log(max(seconds2, 1e-9) / max(seconds1, 1e-9)) / math.log(size2 / size1))
+                          for (size1, seconds1), (size2, seconds2) in zip(points, points[1:])]
+    return exponents
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], threshold: float, memory_threshold: Optional[float] = None) -> List[Tuple[str, str, float]]:
+    """Return (key, metric, growth ratio) of the results whose seconds grew by more than threshold or whose peak_memory
+    grew by more than memory_threshold over the baseline. memory_threshold is threshold by default."""
+    if memory_threshold is None:
+        memory_threshold = threshold
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        for metric, allowed, floor in (("seconds", threshold, 1e-9), ("peak_memory", memory_threshold, 1)):
+            if metric not in baseline[key]:
+                continue
+            ratio = result[metric] / max(baseline[key][metric], floor)
+            if ratio > 1 + allowed:
+                regressions.append((key, metric, ratio))
+    return regressions
+
+
+def _report(results: Dict[str, Dict[str, Any]], baseline: Optional[Dict[str, Dict[str, Any]]]) -> None:
+    print(f"{'benchmark':<40}{'chars':>10}{'time (ms)':>12}{'us/char':>10}{'peak (KiB)':>12}{'time vs base':>14}{'peak vs base':>14}")
+    for key, result in results.items():
+        line = f"{key:<40}{result['characters']:>10}{result['seconds'] * 1e3:>12.3f}{result['seconds'] * 1e6 / result['characters']:>10.3f}{result['peak_memory'] / 1024:>12.1f}"
+        if baseline is not None and key in baseline:
+            line += f"{result['seconds'] / max(baseline[key]['seconds'], 1e-9):>13.2f}x"
+            if "peak_memory" in baseline[key]:
+                line += f"{result['peak_memory'] / max(baseline[key]['peak_memory'], 1):>13.2f}x"
+        print(line)
+    print()
+    print("scaling exponents (1 is linear):")
+    for (scenario, operation), exponents in scaling(results).items():
+        print(f"  {scenario}/{operation}: " + ", ".join(f"{size}: {exponent:.2f}" for size, exponent in exponents))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arguments = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arguments.add_argument("--scenario", action="append", choices=sorted(GENERATORS),
+                           help="scenario to run, can be repeated. All scenarios run by default.")
+    arguments.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000],
+                           help="expression sizes, in operands or nesting levels.")
+    arguments.add_argument("--repeat", type=int, default=5, help="runs per benchmark, the best one is kept.")
+    arguments.add_argument("--baseline", help="baseline JSON file to compare with.")
+    arguments.add_argument("--threshold", type=float, default=0.2,
+                           help="allowed slowdown against the baseline, 0.2 is 20%%.")
+    arguments.add_argument("--memory-threshold", type=float,
+                           help="allowed peak memory growth against the baseline. It is --threshold by default.")
+    arguments.add_argument("--save", help="write the results to this JSON file, to be used as a baseline later.")
+    args = arguments.parse_args(argv)
+
+    results = run(args.scenario or list(GENERATORS), sorted(args.sizes), args.repeat)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+    _report(results, baseline)
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump({"python": sys.version, "platform": platform.platform(), "results": results}, file, indent=2)
+
+    if baseline is not None:
+        memory_threshold = args.threshold if args.memory_threshold is None else args.memory_threshold
+        regressions = compare(results, baseline, args.threshold, memory_threshold)
+        print()
+        if regressions:
+            print(f"{len(regressions)} regressions over {args.threshold:.0%} time or {memory_threshold:.0%} peak memory:")
+            for key, metric, ratio in regressions:
+                print(f"  {key}: {ratio:.2f}x {'slower' if metric == 'seconds' else 'more peak memory'}")
+            return 1
+        print(f"no regressions over {args.threshold:.0%} time or {memory_threshold:.0%} peak memory.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
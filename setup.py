@@ -14,4 +14,7 @@ setup(
     license='MIT',
     keywords='Algebraic Expression Parser',
     install_requires=[],
+    extras_require={
+        'numpy': ['numpy>=1.20'],
+    },
 )